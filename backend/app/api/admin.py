@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import FileResponse
+from typing import Optional
+
+from app.services.analytics_service import analytics_service
+from app.utils.auth import require_admin
+from app.utils.profiling import trace_store
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/profiles")
+async def list_profiles():
+    """List stored request profiles, newest first"""
+    return {"profiles": trace_store.list()}
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    """Download a profile as folded stacks"""
+    path = trace_store.path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+@router.post("/analytics/backfill", status_code=202)
+async def backfill_analytics(user_id: Optional[str] = None):
+    """Rebuild analytics rollups from raw messages, for one user or everyone"""
+    if not analytics_service.start_backfill(user_id):
+        raise HTTPException(status_code=409, detail="A backfill is already running or Redis is unavailable")
+    
+    return analytics_service.backfill_status
+
+@router.get("/analytics/backfill")
+async def get_backfill_status():
+    """Progress of the latest analytics backfill"""
+    return analytics_service.backfill_status
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+
+from app.models.analytics import AnalyticsBucket, AnalyticsGranularity, AnalyticsSummary
+from app.services.analytics_service import METRICS, analytics_service
+from app.utils.auth import get_current_user
+from app.utils.rate_limit import rate_limit
+
+router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
+
+RANGES = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}
+
+def to_bucket(counters: dict) -> AnalyticsBucket:
+    responses = counters["responses"]
+    return AnalyticsBucket(
+        **{metric: counters[metric] for metric in METRICS if metric != "latency_ms"},
+        bucket=counters["bucket"],
+        avg_latency_ms=round(counters["latency_ms"] / responses, 1) if responses else 0.0
+    )
+
+@router.get("/me", response_model=AnalyticsSummary, dependencies=[Depends(rate_limit("read"))])
+async def get_my_analytics(
+    period: str = Query("30d", alias="range", pattern="^(7d|30d|90d|1y)$"),
+    granularity: Optional[AnalyticsGranularity] = Query(None, description="Defaults to day up to 30d, week beyond"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Chat activity rollups for the current user"""
+    days = RANGES[period]
+    granularity = granularity or (AnalyticsGranularity.DAY if days <= 30 else AnalyticsGranularity.WEEK)
+    
+    try:
+        rollups = await analytics_service.get_rollups("user", current_user["id"], granularity, days)
+        totals = {metric: sum(bucket[metric] for bucket in rollups) for metric in METRICS}
+        
+        return AnalyticsSummary(
+            granularity=granularity,
+            buckets=[to_bucket(bucket) for bucket in rollups],
+            totals=to_bucket({"bucket": period, **totals})
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting analytics: {str(e)}")
@@ -0,0 +1,110 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+
+from app.config import settings
+from app.models.batch import BatchJobCreate, BatchJobResponse, BatchJobStatus, BatchItemStatus
+from app.models.user import UserType
+from app.services.batch_service import batch_service
+from app.utils.admission import admission
+from app.utils.auth import get_current_user
+from app.utils.rate_limit import rate_limit
+
+router = APIRouter(prefix="/api/v1/batch", tags=["batch"])
+
+FINISHED = {BatchJobStatus.COMPLETED, BatchJobStatus.PARTIAL, BatchJobStatus.FAILED}
+
+@router.post("/jobs", response_model=BatchJobResponse, status_code=202, dependencies=[Depends(rate_limit("batch")), Depends(admission())])
+async def create_batch_job(
+    request: BatchJobCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Submit a batch of prompts to be answered in the background"""
+    if not request.prompts:
+        raise HTTPException(status_code=400, detail="At least one prompt is required")
+    if len(request.prompts) > settings.batch_max_prompts:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch job accepts at most {settings.batch_max_prompts} prompts"
+        )
+    
+    try:
+        user_type = UserType(request.user_type) if request.user_type else UserType.STUDENT
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unknown user type: {request.user_type}")
+    
+    try:
+        job = await batch_service.submit(
+            user_id=current_user["id"],
+            prompts=request.prompts,
+            user_type=user_type,
+            concurrency=request.concurrency
+        )
+        return job.to_response(include_results=False)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating batch job: {str(e)}")
+
+@router.get("/jobs/{job_id}", response_model=BatchJobResponse, dependencies=[Depends(rate_limit("read"))])
+async def get_batch_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get progress and results of a batch job"""
+    job = await batch_service.get_job(job_id, current_user["id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    
+    return job
+
+@router.get("/jobs/{job_id}/events", dependencies=[Depends(rate_limit("read"))])
+async def stream_batch_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream batch job progress as server-sent events"""
+    job = await batch_service.get_job(job_id, current_user["id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    
+    async def generate_events():
+        # Watch before reading so no change between a read and the wait is missed
+        changed = batch_service.watch(job_id)
+        sent = set()
+        try:
+            while True:
+                snapshot = await batch_service.get_job(job_id, current_user["id"])
+                if not snapshot:
+                    yield f"data: {json.dumps({'error': 'Batch job expired'})}\n\n"
+                    return
+                
+                for item in snapshot.results or []:
+                    if item.index not in sent and item.status in (BatchItemStatus.SUCCEEDED, BatchItemStatus.FAILED):
+                        sent.add(item.index)
+                        yield f"data: {json.dumps({'item': item.model_dump()})}\n\n"
+                
+                progress = snapshot.model_copy(update={"results": None})
+                yield f"data: {json.dumps({'progress': progress.model_dump(mode='json')})}\n\n"
+                
+                if snapshot.status in FINISHED:
+                    yield f"data: {json.dumps({'done': True})}\n\n"
+                    return
+                
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=15.0)
+                    changed.clear()
+                except asyncio.TimeoutError:
+                    # Keep idle connections alive through proxies
+                    yield ": keep-alive\n\n"
+        finally:
+            batch_service.unwatch(job_id, changed)
+    
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
@@ -0,0 +1,124 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import ORJSONResponse
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+
+from app.models.chat import ChatMessageResponse, ConversationResponse, ConversationStatus
+from app.models.user import UserProfile
+from app.services.archive_service import archive_service
+from app.services.cache_service import cache_service
+from app.services.database_service import db_service
+from app.utils.auth import get_current_user
+from app.utils.rate_limit import rate_limit
+
+router = APIRouter(prefix="/api/v1", tags=["bootstrap"])
+
+SECTIONS = {
+    "profile": set(UserProfile.model_fields),
+    "conversations": set(ConversationResponse.model_fields),
+    "messages": set(ChatMessageResponse.model_fields),
+}
+
+def parse_fields(fields: Optional[str]) -> Dict[str, Set[str]]:
+    """Parse ``profile,conversations.id,conversations.title`` into section -> field names"""
+    if not fields:
+        return {section: set(allowed) for section, allowed in SECTIONS.items()}
+
+    selected: Dict[str, Set[str]] = {}
+    for item in fields.split(","):
+        section, _, field = item.strip().partition(".")
+        if section not in SECTIONS or (field and field not in SECTIONS[section]):
+            raise HTTPException(status_code=400, detail=f"Unknown field: {item.strip()}")
+        if field:
+            selected.setdefault(section, set()).add(field)
+        else:
+            selected[section] = set(SECTIONS[section])
+    return selected
+
+def project(row: Dict[str, Any], fields: Set[str]) -> Dict[str, Any]:
+    return {field: row.get(field) for field in fields}
+
+async def load_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    profile = await cache_service.get_user_profile(user_id)
+    if not profile:
+        profile = await db_service.get_user_profile(user_id)
+        if profile:
+            await cache_service.set_user_profile(user_id, profile)
+    return profile
+
+async def load_conversations(user_id: str) -> List[Dict[str, Any]]:
+    conversations = await cache_service.get_user_conversations(user_id)
+    if conversations is None:
+        conversations = await db_service.get_user_conversations(user_id)
+        await cache_service.set_user_conversations(user_id, conversations)
+    return conversations
+
+async def load_messages(conversation: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    if conversation.get("status") == ConversationStatus.ARCHIVED.value:
+        messages = await archive_service.get_archived_messages(conversation["id"])
+        return messages[-limit:]
+    return await db_service.get_recent_messages(conversation["id"], limit=limit)
+
+async def load_owned_messages(conversation_id: str, user_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+    conversation = await db_service.get_conversation(conversation_id, user_id)
+    if not conversation:
+        return None
+    return await load_messages(conversation, limit)
+
+@router.get("/bootstrap", dependencies=[Depends(rate_limit("read"))])
+async def bootstrap(
+    fields: Optional[str] = Query(None, description="Sections or section.field names to include, comma-separated"),
+    conversation_id: Optional[str] = Query(None, description="Conversation to load messages for; defaults to the latest"),
+    messages_limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user)
+):
+    """Everything the dashboard renders on load, in one round trip"""
+    selected = parse_fields(fields)
+    user_id = current_user["id"]
+
+    try:
+        # Independent lookups run concurrently; messages only wait on the
+        # conversation list when we have to pick the latest conversation
+        tasks = {}
+        if "profile" in selected:
+            tasks["profile"] = load_profile(user_id)
+        if "conversations" in selected or ("messages" in selected and not conversation_id):
+            tasks["conversations"] = load_conversations(user_id)
+        if "messages" in selected and conversation_id:
+            tasks["messages"] = load_owned_messages(conversation_id, user_id, messages_limit)
+
+        results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+
+        payload: Dict[str, Any] = {}
+        if "profile" in selected:
+            profile = results["profile"]
+            payload["profile"] = project(profile, selected["profile"]) if profile else None
+
+        if "conversations" in selected:
+            payload["conversations"] = [
+                project(conversation, selected["conversations"])
+                for conversation in results["conversations"]
+            ]
+
+        if "messages" in selected:
+            if conversation_id:
+                messages = results["messages"]
+                if messages is None:
+                    raise HTTPException(status_code=404, detail="Conversation not found")
+            elif results["conversations"]:
+                latest = results["conversations"][0]
+                conversation_id = latest["id"]
+                messages = await load_messages(latest, messages_limit)
+            else:
+                messages = []
+            payload["messages"] = {
+                "conversation_id": conversation_id,
+                "items": [project(message, selected["messages"]) for message in messages]
+            }
+
+        return ORJSONResponse(payload)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading dashboard: {str(e)}")
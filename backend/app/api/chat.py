@@ -1,49 +1,92 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Header, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 import json
 import asyncio
+import logging
+import time
 from datetime import datetime
 
+from app.config import settings
 from app.models.chat import (
     ChatRequest, ChatResponse, ChatMessage, ChatMessageCreate, 
     ChatMessageResponse, Conversation, ConversationCreate, ConversationResponse,
-    MessageType
+    MessageType, ConversationStatus
 )
+from app.models.history import ASSISTANT, USER, ConversationHistory
 from app.models.user import UserType
 from app.services.ai_service import ai_service
+from app.services.analytics_service import analytics_service
+from app.services.archive_service import archive_service
 from app.services.database_service import db_service
 from app.services.cache_service import cache_service
+from app.services.export_service import (
+    ExportBusyError, InvalidCursorError, decode_cursor, export_service
+)
+from app.services.notification_service import notification_service
+from app.services.summary_service import summary_service
+from app.services.title_service import DEFAULT_TITLE, title_service
+from app.services.idempotency_service import (
+    idempotency_service, IdempotencyConflictError, IdempotencyInProgressError
+)
+from app.utils.admission import AdmissionSlot, admission
 from app.utils.auth import get_current_user
+from app.utils.rate_limit import rate_limit, ip_rate_limit
+from app.utils.streaming import single_page, stream_rows, stream_with_cleanup
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/chat", tags=["chat"])
 
-@router.post("/simple", response_model=ChatResponse)
-async def simple_chat(request: ChatRequest):
+@router.post("/simple", response_model=ChatResponse, dependencies=[Depends(ip_rate_limit("simple")), Depends(admission(degradable=True))])
+async def simple_chat(request: ChatRequest, http_request: Request):
     """Simple chat endpoint without authentication for demo purposes"""
     try:
         # Default to student if no user type specified
         user_type = UserType(request.user_type) if request.user_type else UserType.STUDENT
+        metadata = {"demo_mode": True}
         
-        # Generate AI response with empty conversation history for simple chat
-        ai_response = await ai_service.generate_response(
-            message=request.message,
-            conversation_history=[],
-            user_type=user_type
-        )
+        # Under overload, admission control lets this endpoint through only for cached answers
+        if getattr(http_request.state, "degraded", False):
+            ai_response = await cache_service.get_simple_answer(user_type.value, request.message)
+            if ai_response is None:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is overloaded, please retry shortly",
+                    headers={"Retry-After": str(settings.admission_retry_after)}
+                )
+            metadata.update(cached=True, degraded=True)
+        else:
+            try:
+                # Generate AI response with empty conversation history for simple chat
+                ai_response = await ai_service.complete(
+                    message=request.message,
+                    conversation_history=ConversationHistory(),
+                    user_type=user_type
+                )
+                await cache_service.set_simple_answer(user_type.value, request.message, ai_response)
+            except Exception as e:
+                logger.error(f"Error generating simple chat response: {str(e)}")
+                ai_response = await cache_service.get_simple_answer(user_type.value, request.message)
+                if ai_response is None:
+                    ai_response = "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+                else:
+                    metadata["cached"] = True
         
         return ChatResponse(
             message_id=f"demo-{datetime.now().timestamp()}",
             conversation_id=request.conversation_id or f"demo-conv-{datetime.now().timestamp()}",
             response=ai_response,
             user_type=user_type.value,
-            metadata={"demo_mode": True}
+            metadata=metadata
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
-@router.post("/conversation/create", response_model=ConversationResponse)
+@router.post("/conversation/create", response_model=ConversationResponse, dependencies=[Depends(rate_limit("write"))])
 async def create_conversation(
     request: ConversationCreate,
     current_user: dict = Depends(get_current_user)
@@ -51,7 +94,7 @@ async def create_conversation(
     """Create a new conversation"""
     try:
         conversation_data = {
-            "title": request.title or "New Conversation",
+            "title": request.title or DEFAULT_TITLE,
             "user_type": request.user_type
         }
         
@@ -59,38 +102,92 @@ async def create_conversation(
             user_id=current_user["id"],
             conversation_data=conversation_data
         )
+        await cache_service.invalidate_user_conversations(current_user["id"])
         
         return ConversationResponse(**conversation)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating conversation: {str(e)}")
 
-@router.get("/conversations", response_model=List[ConversationResponse])
+@router.get("/conversations", response_model=List[ConversationResponse], dependencies=[Depends(rate_limit("read"))])
 async def get_conversations(
+    http_request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     """Get all conversations for the current user"""
     try:
-        conversations = await db_service.get_user_conversations(current_user["id"])
-        return [ConversationResponse(**conv) for conv in conversations]
+        conversations = await cache_service.get_user_conversations(current_user["id"])
+        if conversations is None:
+            conversations = await db_service.get_user_conversations(current_user["id"])
+            await cache_service.set_user_conversations(current_user["id"], conversations)
+        version = [(c["id"], c["updated_at"], c["message_count"], c.get("title"), c["status"]) for c in conversations]
+        return await stream_rows(http_request, single_page(conversations), ConversationResponse, version=version)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting conversations: {str(e)}")
 
-@router.post("/conversation/{conversation_id}/message", response_model=ChatResponse)
+@router.get("/export", dependencies=[Depends(rate_limit("read"))])
+async def export_history(
+    format: str = Query("ndjson", pattern="^(ndjson|zip)$"),
+    cursor: Optional[str] = Query(None, description="Resume cursor from a previous, interrupted export"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream the user's full chat history as NDJSON or a zip of JSON files"""
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        release = export_service.acquire()
+    except ExportBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    if format == "zip":
+        chunks, media_type = export_service.zip(current_user["id"], cursor), "application/zip"
+    else:
+        chunks, media_type = export_service.ndjson(current_user["id"], cursor), "application/x-ndjson"
+    
+    return stream_with_cleanup(
+        chunks,
+        release,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="chat-history.{format}"'}
+    )
+
+@router.post("/conversation/{conversation_id}/message", response_model=ChatResponse, dependencies=[Depends(rate_limit("chat"))])
 async def send_message(
     conversation_id: str,
     request: ChatMessageCreate,
     background_tasks: BackgroundTasks,
-    current_user: dict = Depends(get_current_user)
+    http_response: Response,
+    current_user: dict = Depends(get_current_user),
+    slot: AdmissionSlot = Depends(admission()),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """Send a message in a conversation"""
+    fingerprint = None
     try:
         # Verify conversation belongs to user
         conversation = await db_service.get_conversation(conversation_id, current_user["id"])
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
+        # Writing to an archived conversation brings it back to the hot tables
+        if conversation.get("status") == ConversationStatus.ARCHIVED.value:
+            await archive_service.rehydrate(conversation_id)
+        
+        # A retried request gets the original response instead of a second completion
+        if idempotency_key:
+            fingerprint = idempotency_service.fingerprint(
+                conversation_id, request.content, request.message_type.value, request.metadata
+            )
+            replay = await claim_idempotency_key(current_user["id"], idempotency_key, fingerprint, slot)
+            if replay is not None:
+                http_response.headers["Idempotent-Replayed"] = "true"
+                return ChatResponse(**replay)
+        
         # Get user profile to determine user type
         user_profile = await cache_service.get_user_profile(current_user["id"])
         if not user_profile:
@@ -101,19 +198,7 @@ async def send_message(
         user_type = UserType(user_profile.get("user_type", "student")) if user_profile else UserType.STUDENT
         
         # Get conversation history from cache or database
-        cached_history = await cache_service.get_conversation_history(conversation_id)
-        if cached_history:
-            conversation_history = cached_history
-        else:
-            messages = await db_service.get_conversation_messages(conversation_id)
-            conversation_history = [
-                {
-                    "role": "assistant" if msg["message_type"] == "assistant" else "user",
-                    "content": msg["content"]
-                }
-                for msg in messages
-            ]
-            await cache_service.set_conversation_history(conversation_id, conversation_history)
+        conversation_history = await load_history(conversation)
         
         # Save user message
         user_message_data = {
@@ -123,14 +208,22 @@ async def send_message(
             "metadata": request.metadata
         }
         
-        user_message = await db_service.create_message(user_message_data)
+        # Generate AI response; a failure must not be stored as this key's result
+        started = time.perf_counter()
+        try:
+            ai_response = await ai_service.complete(
+                message=request.content,
+                conversation_history=conversation_history,
+                user_type=user_type
+            )
+        except Exception as e:
+            logger.error(f"Error generating AI response: {str(e)}")
+            if fingerprint:
+                await idempotency_service.fail(current_user["id"], idempotency_key)
+            raise HTTPException(status_code=502, detail="AI service is temporarily unavailable, please retry")
         
-        # Generate AI response
-        ai_response = await ai_service.generate_response(
-            message=request.content,
-            conversation_history=conversation_history,
-            user_type=user_type
-        )
+        # Save the user message only once there is a response to go with it
+        user_message = await db_service.create_message(user_message_data)
         
         # Save AI response
         ai_message_data = {
@@ -141,18 +234,22 @@ async def send_message(
         }
         
         ai_message = await db_service.create_message(ai_message_data)
+        await cache_service.invalidate_user_conversations(current_user["id"])
+        await analytics_service.record_exchange(
+            current_user["id"], user_type.value, request.content, ai_response,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            new_session=not conversation_history
+        )
         
         # Update cache in background
-        background_tasks.add_task(
-            update_conversation_cache,
-            conversation_id,
-            conversation_history + [
-                {"role": "user", "content": request.content},
-                {"role": "assistant", "content": ai_response}
-            ]
-        )
+        conversation_history.append(USER, request.content)
+        conversation_history.append(ASSISTANT, ai_response)
+        background_tasks.add_task(update_conversation_cache, conversation_id, conversation_history)
+        summary_service.maybe_schedule(conversation_id, conversation_history)
+        if len(conversation_history) == 2 and not conversation_history.summarized:
+            title_service.enqueue(conversation, request.content, ai_response)
         
-        return ChatResponse(
+        chat_response = ChatResponse(
             message_id=ai_message["id"],
             conversation_id=conversation_id,
             response=ai_response,
@@ -160,40 +257,85 @@ async def send_message(
             metadata=ai_message.get("metadata")
         )
         
+        if fingerprint:
+            await idempotency_service.complete(
+                current_user["id"], idempotency_key, fingerprint, chat_response.model_dump(mode="json")
+            )
+        
+        return chat_response
+        
+    except HTTPException:
+        raise
     except Exception as e:
+        if fingerprint:
+            await idempotency_service.fail(current_user["id"], idempotency_key)
         raise HTTPException(status_code=500, detail=f"Error sending message: {str(e)}")
 
-@router.get("/conversation/{conversation_id}/messages", response_model=List[ChatMessageResponse])
+@router.get("/conversation/{conversation_id}/messages", response_model=List[ChatMessageResponse], dependencies=[Depends(rate_limit("read"))])
 async def get_conversation_messages(
     conversation_id: str,
+    http_request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all messages in a conversation"""
+    """Get all messages in a conversation, streamed page by page"""
     try:
         # Verify conversation belongs to user
         conversation = await db_service.get_conversation(conversation_id, current_user["id"])
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        messages = await db_service.get_conversation_messages(conversation_id)
-        return [ChatMessageResponse(**msg) for msg in messages]
+        # Every write bumps message_count and updated_at, so unchanged
+        # histories are answered with a 304 before any message is read
+        version = (conversation_id, conversation["message_count"], conversation["updated_at"], conversation["status"])
+        
+        if conversation.get("status") == ConversationStatus.ARCHIVED.value:
+            pages = archived_pages(conversation_id)
+        else:
+            pages = db_service.iter_conversation_messages(conversation_id, page_size=200)
+        return await stream_rows(http_request, pages, ChatMessageResponse, version=version)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting messages: {str(e)}")
 
-@router.post("/conversation/{conversation_id}/stream")
+@router.post("/conversation/{conversation_id}/stream", dependencies=[Depends(rate_limit("chat"))])
 async def stream_chat(
     conversation_id: str,
     request: ChatMessageCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    slot: AdmissionSlot = Depends(admission()),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """Stream AI response for real-time chat"""
+    fingerprint = None
     try:
         # Verify conversation belongs to user
         conversation = await db_service.get_conversation(conversation_id, current_user["id"])
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
+        # Writing to an archived conversation brings it back to the hot tables
+        if conversation.get("status") == ConversationStatus.ARCHIVED.value:
+            await archive_service.rehydrate(conversation_id)
+        
+        # A retried request replays the original response instead of generating again
+        if idempotency_key:
+            fingerprint = idempotency_service.fingerprint(
+                conversation_id, request.content, request.message_type.value, request.metadata, "stream"
+            )
+            replay = await claim_idempotency_key(current_user["id"], idempotency_key, fingerprint, slot)
+            if replay is not None:
+                return StreamingResponse(
+                    replay_stream(replay["response"]),
+                    media_type="text/event-stream",
+                    headers={
+                        "Cache-Control": "no-cache",
+                        "Connection": "keep-alive",
+                        "Idempotent-Replayed": "true",
+                    }
+                )
+        
         # Get user profile and conversation history (similar to send_message)
         user_profile = await cache_service.get_user_profile(current_user["id"])
         if not user_profile:
@@ -201,35 +343,60 @@ async def stream_chat(
         
         user_type = UserType(user_profile.get("user_type", "student")) if user_profile else UserType.STUDENT
         
-        cached_history = await cache_service.get_conversation_history(conversation_id)
-        if cached_history:
-            conversation_history = cached_history
-        else:
-            messages = await db_service.get_conversation_messages(conversation_id)
-            conversation_history = [
-                {
-                    "role": "assistant" if msg["message_type"] == "assistant" else "user",
-                    "content": msg["content"]
-                }
-                for msg in messages
-            ]
+        conversation_history = await load_history(conversation)
+        
+        # Completed by the stream on success, released by its cleanup otherwise
+        key_settled = not fingerprint
+        
+        async def release_key():
+            nonlocal key_settled
+            if not key_settled:
+                key_settled = True
+                await idempotency_service.fail(current_user["id"], idempotency_key)
         
         async def generate_stream():
+            nonlocal key_settled
             full_response = ""
-            async for chunk in ai_service.generate_streaming_response(
-                message=request.content,
-                conversation_history=conversation_history,
-                user_type=user_type
-            ):
-                full_response += chunk
-                yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+            started = time.perf_counter()
+            try:
+                async for chunk in ai_service.stream(
+                    message=request.content,
+                    conversation_history=conversation_history,
+                    user_type=user_type
+                ):
+                    full_response += chunk
+                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+            except Exception as e:
+                logger.error(f"Error streaming AI response: {str(e)}")
+                yield f"data: {json.dumps({'error': 'AI service is temporarily unavailable, please retry'})}\n\n"
+                return
             
             # Save messages after streaming is complete
-            await save_streamed_messages(conversation_id, request.content, full_response)
+            await save_streamed_messages(conversation_id, current_user["id"], request.content, full_response)
+            await analytics_service.record_exchange(
+                current_user["id"], user_type.value, request.content, full_response,
+                latency_ms=(time.perf_counter() - started) * 1000,
+                new_session=not conversation_history
+            )
+            conversation_history.append(USER, request.content)
+            conversation_history.append(ASSISTANT, full_response)
+            await update_conversation_cache(conversation_id, conversation_history)
+            summary_service.maybe_schedule(conversation_id, conversation_history)
+            if len(conversation_history) == 2 and not conversation_history.summarized:
+                title_service.enqueue(conversation, request.content, full_response)
+            await notification_service.publish(
+                current_user["id"], "chat.response_ready", {"conversation_id": conversation_id}
+            )
+            if fingerprint:
+                await idempotency_service.complete(
+                    current_user["id"], idempotency_key, fingerprint, {"response": full_response}
+                )
+                key_settled = True
             yield f"data: {json.dumps({'done': True})}\n\n"
         
-        return StreamingResponse(
+        return stream_with_cleanup(
             generate_stream(),
+            release_key,
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -237,14 +404,51 @@ async def stream_chat(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
+        if fingerprint:
+            await idempotency_service.fail(current_user["id"], idempotency_key)
         raise HTTPException(status_code=500, detail=f"Error streaming chat: {str(e)}")
 
-async def update_conversation_cache(conversation_id: str, conversation_history: List[Dict[str, str]]):
+async def archived_pages(conversation_id: str):
+    """Messages of an archived conversation as a single page"""
+    yield await archive_service.get_archived_messages(conversation_id)
+
+async def claim_idempotency_key(user_id: str, key: str, fingerprint: str, slot: AdmissionSlot) -> Optional[Dict[str, Any]]:
+    """Claim an Idempotency-Key, returning the stored response if this is a retry"""
+    try:
+        return await idempotency_service.begin(user_id, key, fingerprint, waiting=slot.released)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+
+async def replay_stream(response: str):
+    """Replay a stored streamed response as a single chunk"""
+    yield f"data: {json.dumps({'chunk': response})}\n\n"
+    yield f"data: {json.dumps({'done': True})}\n\n"
+
+async def load_history(conversation: Dict[str, Any]) -> ConversationHistory:
+    """Conversation history from cache, falling back to the database"""
+    summary = conversation.get("summary")
+    summarized = conversation.get("summary_message_count") or 0
+    history = await cache_service.get_conversation_history(conversation["id"])
+    if history is None:
+        # Messages covered by the summary are never loaded
+        messages = await db_service.get_conversation_messages(conversation["id"], offset=summarized)
+        history = ConversationHistory.from_rows(messages, summary, summarized)
+        await cache_service.set_conversation_history(conversation["id"], history)
+    else:
+        # The cached copy may predate a summary written by another request
+        history.set_summary(summary, summarized)
+    return history
+
+async def update_conversation_cache(conversation_id: str, conversation_history: ConversationHistory):
     """Background task to update conversation cache"""
     await cache_service.set_conversation_history(conversation_id, conversation_history)
 
-async def save_streamed_messages(conversation_id: str, user_message: str, ai_response: str):
+async def save_streamed_messages(conversation_id: str, user_id: str, user_message: str, ai_response: str):
     """Save messages after streaming is complete"""
     try:
         # Save user message
@@ -262,6 +466,7 @@ async def save_streamed_messages(conversation_id: str, user_message: str, ai_res
             "message_type": MessageType.ASSISTANT.value
         }
         await db_service.create_message(ai_message_data)
+        await cache_service.invalidate_user_conversations(user_id)
         
     except Exception as e:
         print(f"Error saving streamed messages: {str(e)}")
\ No newline at end of file
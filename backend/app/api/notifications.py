@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Depends
+
+from app.services.notification_service import TooManySubscribersError, notification_service
+from app.utils.auth import get_current_user
+from app.utils.rate_limit import rate_limit
+from app.utils.streaming import stream_with_cleanup
+
+router = APIRouter(prefix="/api/v1/notifications", tags=["notifications"])
+
+@router.get("/stream", dependencies=[Depends(rate_limit("read"))])
+async def stream_notifications(
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream the current user's notifications as server-sent events"""
+    try:
+        subscriber = notification_service.subscribe(current_user["id"])
+    except TooManySubscribersError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    return stream_with_cleanup(
+        notification_service.stream(subscriber),
+        lambda: notification_service.unsubscribe(subscriber),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+    )
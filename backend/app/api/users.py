@@ -1,14 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Optional
+import hashlib
+import json
 
-from app.models.user import UserProfile, UserProfileCreate, UserProfileUpdate
+from app.models.user import (
+    UserProfile, UserProfileCreate, UserProfileUpdate, Recommendation, RecommendationKind
+)
 from app.services.database_service import db_service
 from app.services.cache_service import cache_service
+from app.services.matching_service import matching_service
+from app.services.notification_service import notification_service
 from app.utils.auth import get_current_user
+from app.utils.rate_limit import rate_limit
 
 router = APIRouter(prefix="/api/v1/users", tags=["users"])
 
-@router.post("/profile", response_model=UserProfile)
+@router.post("/profile", response_model=UserProfile, dependencies=[Depends(rate_limit("write"))])
 async def create_user_profile(
     profile_data: UserProfileCreate,
     current_user: dict = Depends(get_current_user)
@@ -35,7 +42,7 @@ async def create_user_profile(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating profile: {str(e)}")
 
-@router.get("/profile", response_model=UserProfile)
+@router.get("/profile", response_model=UserProfile, dependencies=[Depends(rate_limit("read"))])
 async def get_user_profile(
     current_user: dict = Depends(get_current_user)
 ):
@@ -61,7 +68,7 @@ async def get_user_profile(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting profile: {str(e)}")
 
-@router.put("/profile", response_model=UserProfile)
+@router.put("/profile", response_model=UserProfile, dependencies=[Depends(rate_limit("write"))])
 async def update_user_profile(
     profile_data: UserProfileUpdate,
     current_user: dict = Depends(get_current_user)
@@ -84,6 +91,9 @@ async def update_user_profile(
         
         # Update cache
         await cache_service.set_user_profile(current_user["id"], profile)
+        await notification_service.publish(
+            current_user["id"], "profile.updated", {"fields": sorted(profile_data.dict(exclude_none=True))}
+        )
         
         return UserProfile(**profile)
         
@@ -92,7 +102,7 @@ async def update_user_profile(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating profile: {str(e)}")
 
-@router.delete("/profile")
+@router.delete("/profile", dependencies=[Depends(rate_limit("write"))])
 async def delete_user_profile(
     current_user: dict = Depends(get_current_user)
 ):
@@ -105,4 +115,38 @@ async def delete_user_profile(
         return {"message": "Profile deleted successfully"}
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting profile: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error deleting profile: {str(e)}")
+
+@router.get("/recommendations", response_model=List[Recommendation], dependencies=[Depends(rate_limit("read"))])
+async def get_recommendations(
+    kind: Optional[RecommendationKind] = None,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """Recommend roles and learning paths matching the user's profile"""
+    try:
+        profile = await cache_service.get_user_profile(current_user["id"])
+        if not profile:
+            profile = await db_service.get_user_profile(current_user["id"])
+            if not profile:
+                raise HTTPException(status_code=404, detail="User profile not found")
+            await cache_service.set_user_profile(current_user["id"], profile)
+        
+        # Keyed by the fields that drive matching, so a profile change is a cache miss
+        matched_fields = [profile.get(f) for f in ("skills", "industry_interests", "career_goals", "experience_level")]
+        profile_hash = hashlib.sha256(json.dumps(matched_fields, default=str).encode()).hexdigest()[:16]
+        variant = f"{profile_hash}:{kind.value if kind else 'all'}:{limit}"
+        
+        recommendations = await cache_service.get_recommendations(current_user["id"], variant)
+        if recommendations is None:
+            recommendations = matching_service.recommend(
+                profile, kind=kind.value if kind else None, limit=limit
+            )
+            await cache_service.set_recommendations(current_user["id"], variant, recommendations)
+        
+        return recommendations
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting recommendations: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.config import settings
+from app.models.voice import TTSRequest
+from app.services.tts_service import tts_service
+from app.utils.admission import admission
+from app.utils.auth import get_current_user
+from app.utils.rate_limit import rate_limit
+
+router = APIRouter(prefix="/api/v1/voice", tags=["voice"])
+
+@router.post("/tts", dependencies=[Depends(rate_limit("tts")), Depends(admission())])
+async def text_to_speech(
+    request: TTSRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Synthesise speech, streaming new audio and serving repeats from the cache"""
+    if not tts_service.enabled:
+        raise HTTPException(status_code=503, detail="Text-to-speech is not configured")
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="Text is required")
+    if len(request.text) > settings.tts_max_chars:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Text is limited to {settings.tts_max_chars} characters"
+        )
+    
+    key = tts_service.cache_key(request.text, request.voice_id, request.model_id)
+    
+    cached_path = tts_service.cache.get(key)
+    if cached_path:
+        return FileResponse(
+            cached_path,
+            media_type="audio/mpeg",
+            headers={"X-Cache": "HIT", "Cache-Control": "private, max-age=86400"}
+        )
+    
+    try:
+        upstream = await tts_service.open_stream(request.text, request.voice_id, request.model_id)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error synthesising speech: {str(e)}")
+    
+    return StreamingResponse(
+        tts_service.relay(key, upstream),
+        media_type="audio/mpeg",
+        headers={"X-Cache": "MISS", "Cache-Control": "no-cache"}
+    )
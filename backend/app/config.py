@@ -17,11 +17,111 @@ class Settings(BaseSettings):
     groq_base_url: str = "https://api.groq.com/openai/v1"
     groq_model: str = "llama-3.1-8b-instant"
     
+    # Server
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 0  # 0 = one worker per available CPU core
+    keepalive_timeout: int = 5
+    backlog: int = 2048
+    max_requests: int = 10000
+    max_requests_jitter: int = 1000
+    graceful_timeout: int = 30
+    
+    # Batch jobs
+    batch_worker_count: int = 8
+    batch_max_prompts: int = 50
+    batch_job_concurrency: int = 4
+    batch_item_timeout: float = 60.0
+    batch_result_ttl: int = 3600
+    
+    # Idempotency keys
+    idempotency_ttl: int = 86400
+    idempotency_lock_ttl: int = 120
+    idempotency_wait_timeout: float = 60.0
+    
+    # Chat history export
+    export_page_size: int = 200
+    export_pages_per_second: float = 10.0
+    export_max_concurrent: int = 2
+    
+    # Analytics rollups
+    analytics_enabled: bool = True
+    analytics_retention_days: int = 400
+    analytics_backfill_lock_ttl: int = 600
+    
+    # Conversation summaries
+    summary_enabled: bool = True
+    summary_model: str = "llama-3.1-8b-instant"
+    summary_every_turns: int = 10
+    summary_max_tokens: int = 400
+    
+    # Conversation titles
+    titling_enabled: bool = True
+    titling_model: str = "llama-3.1-8b-instant"
+    titling_batch_size: int = 20
+    titling_max_delay: float = 2.0
+    titling_queue_size: int = 1000
+    
+    # Notifications
+    notifications_enabled: bool = True
+    notification_queue_size: int = 100
+    notification_keepalive: float = 15.0
+    notification_max_subscribers: int = 10000
+    
+    # Conversation archival
+    archive_enabled: bool = True
+    archive_idle_days: int = 30
+    archive_interval: int = 3600
+    archive_batch_size: int = 100
+    
+    # Admission control for LLM-bound requests (per worker)
+    admission_enabled: bool = True
+    admission_max_inflight: int = 64
+    admission_max_queue: int = 128
+    admission_queue_timeout: float = 2.0
+    admission_max_loop_lag_ms: float = 500.0
+    admission_retry_after: int = 5
+    
+    # Rate limiting: requests and estimated LLM tokens per window, per tier
+    rate_limit_enabled: bool = True
+    rate_limit_window: int = 60
+    rate_limit_trust_forwarded: bool = False
+    rate_limit_simple_requests: int = 10
+    rate_limit_simple_tokens: int = 20000
+    rate_limit_chat_requests: int = 30
+    rate_limit_chat_tokens: int = 60000
+    rate_limit_batch_requests: int = 5
+    rate_limit_batch_tokens: int = 150000
+    rate_limit_read_requests: int = 120
+    rate_limit_write_requests: int = 30
+    rate_limit_tts_requests: int = 30
+    
     # Redis
     redis_url: str = "redis://localhost:6379"
     
     # Voice Service (optional)
     elevenlabs_api_key: Optional[str] = None
+    elevenlabs_base_url: str = "https://api.elevenlabs.io"
+    elevenlabs_voice_id: str = "21m00Tcm4TlvDq8ikWAM"
+    elevenlabs_model: str = "eleven_monolingual_v1"
+    tts_allowed_models: list = ["eleven_monolingual_v1", "eleven_multilingual_v2", "eleven_turbo_v2"]
+    tts_max_chars: int = 5000
+    tts_cache_dir: str = "tts_cache"
+    tts_cache_max_bytes: int = 512 * 1024 * 1024
+    
+    # Event loop monitoring
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval: float = 0.1
+    loop_blocking_threshold_ms: float = 100.0
+    loop_monitor_log_interval: float = 60.0
+    loop_monitor_strict: bool = False
+    
+    # Admin & profiling
+    admin_secret: Optional[str] = None
+    profiling_sample_rate: float = 0.0
+    profiling_interval_ms: float = 5.0
+    profiling_dir: str = "profiles"
+    profiling_max_traces: int = 50
     
     # CORS
     allowed_origins: list = ["http://localhost:5173", "http://localhost:3000"]
@@ -1,11 +1,21 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
-import uvicorn
 
 from app.config import settings
-from app.api import chat, users
+from app.api import chat, users, batch, admin, voice, bootstrap, analytics, notifications
+from app.services.archive_service import archive_service
+from app.services.summary_service import summary_service
+from app.services.title_service import title_service
+from app.services.notification_service import notification_service
+from app.services.batch_service import batch_service
+from app.services.tts_service import tts_service
+from app.utils.auth import verify_admin_secret
+from app.utils.loop_monitor import BlockingCallMiddleware, loop_monitor
+from app.utils.metrics import metrics
+from app.utils.profiling import ProfilingMiddleware, profiling_enabled
+from app.utils.rate_limit import RateLimitHeadersMiddleware
 
 # Configure logging
 logging.basicConfig(
@@ -23,18 +33,57 @@ app = FastAPI(
     redoc_url="/redoc" if settings.debug else None
 )
 
-# CORS middleware
+# Rate limit headers are attached here so they survive endpoint-built responses
+app.add_middleware(RateLimitHeadersMiddleware)
+
+# Request profiling is only installed when configured, so it costs nothing otherwise
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware, authorize=verify_admin_secret)
+
+# Strict mode fails requests that block the event loop (tests and benchmarks)
+if settings.loop_monitor_enabled and settings.loop_monitor_strict:
+    app.add_middleware(BlockingCallMiddleware, monitor=loop_monitor)
+
+# CORS middleware is added last so it is outermost and also covers error responses
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy", "Retry-After", "Idempotent-Replayed"],
 )
 
 # Include routers
 app.include_router(chat.router)
 app.include_router(users.router)
+app.include_router(bootstrap.router)
+app.include_router(batch.router)
+app.include_router(voice.router)
+app.include_router(analytics.router)
+app.include_router(notifications.router)
+app.include_router(admin.router)
+
+@app.on_event("startup")
+async def startup():
+    """Start background workers"""
+    if settings.loop_monitor_enabled:
+        await loop_monitor.start()
+    await batch_service.start()
+    await archive_service.start()
+    await title_service.start()
+    await notification_service.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background workers"""
+    await loop_monitor.stop()
+    await batch_service.stop()
+    await archive_service.stop()
+    await summary_service.stop()
+    await title_service.stop()
+    await notification_service.stop()
+    await tts_service.close()
 
 @app.get("/")
 async def root():
@@ -63,6 +112,11 @@ async def health_check():
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=503, detail="Service unavailable")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics for this worker process"""
+    return metrics.render()
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -73,10 +127,5 @@ async def global_exception_handler(request, exc):
     )
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=settings.debug,
-        log_level="info"
-    )
\ No newline at end of file
+    from app.server import run
+    run()
\ No newline at end of file
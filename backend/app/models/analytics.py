@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List
+from enum import Enum
+
+class AnalyticsGranularity(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+
+class AnalyticsBucket(BaseModel):
+    bucket: str
+    sessions: int = 0
+    messages: int = 0
+    responses: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    avg_latency_ms: float = 0.0
+
+class AnalyticsSummary(BaseModel):
+    granularity: AnalyticsGranularity
+    buckets: List[AnalyticsBucket]
+    totals: AnalyticsBucket
@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+from enum import Enum
+
+class BatchJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    PARTIAL = "partial"
+    FAILED = "failed"
+
+class BatchItemStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class BatchJobCreate(BaseModel):
+    prompts: List[str]
+    user_type: Optional[str] = None
+    concurrency: Optional[int] = None
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: BatchItemStatus = BatchItemStatus.PENDING
+    response: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchJobResponse(BaseModel):
+    job_id: str
+    status: BatchJobStatus
+    user_type: str
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    results: Optional[List[BatchItemResult]] = None
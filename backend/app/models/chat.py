@@ -41,6 +41,8 @@ class Conversation(BaseModel):
     status: ConversationStatus = ConversationStatus.ACTIVE
     user_type: Optional[str] = None
     message_count: int = 0
+    summary: Optional[str] = None
+    summary_message_count: int = 0
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
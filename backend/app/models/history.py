@@ -0,0 +1,138 @@
+"""Compact in-memory conversation history.
+
+A history is stored column-wise: one byte per role, a list of content
+strings and an array of per-message token counts, instead of one dict per
+message. Roles are interned, token counts are computed once on append, and
+``tail`` returns a view over the last messages without copying them. The
+same object flows from the loader through ``AIService.build_messages`` to
+the cache.
+
+A history may also start with a running summary, maintained by the
+summary service. ``summarized`` messages of the conversation come before
+the first message held, and the summary covers all of them.
+"""
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+USER = sys.intern("user")
+ASSISTANT = sys.intern("assistant")
+SYSTEM = sys.intern("system")
+
+ROLE_CODES = {USER: ord("u"), ASSISTANT: ord("a"), SYSTEM: ord("s")}
+CODE_ROLES = {code: role for role, code in ROLE_CODES.items()}
+
+def count_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return len(text) // 4 + 1
+
+class HistoryView:
+    """Read-only window over a slice of a ConversationHistory"""
+
+    __slots__ = ("_history", "_start", "_stop")
+
+    def __init__(self, history: "ConversationHistory", start: int, stop: int):
+        self._history = history
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        history = self._history
+        for i in range(self._start, self._stop):
+            yield CODE_ROLES[history._roles[i]], history._contents[i]
+
+    @property
+    def token_count(self) -> int:
+        tokens = self._history._tokens
+        return sum(tokens[i] for i in range(self._start, self._stop))
+
+    def messages(self) -> Iterator[Dict[str, str]]:
+        """Chat API message dicts, built lazily"""
+        for role, content in self:
+            yield {"role": role, "content": content}
+
+class ConversationHistory:
+    __slots__ = ("_roles", "_contents", "_tokens", "_token_count", "summary", "summarized")
+
+    def __init__(self):
+        self._roles = bytearray()
+        self._contents: List[str] = []
+        self._tokens = array("I")
+        self._token_count = 0
+        self.summary: Optional[str] = None
+        self.summarized = 0
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.tail(len(self)))
+
+    def append(self, role: str, content: str, tokens: Optional[int] = None):
+        tokens = count_tokens(content) if tokens is None else tokens
+        self._roles.append(ROLE_CODES[role])
+        self._contents.append(content)
+        self._tokens.append(tokens)
+        self._token_count += tokens
+
+    @property
+    def token_count(self) -> int:
+        return self._token_count
+
+    def tail(self, n: int) -> HistoryView:
+        """View over the last n messages"""
+        stop = len(self)
+        return HistoryView(self, max(0, stop - n), stop)
+
+    def view(self, start: int, stop: int) -> HistoryView:
+        return HistoryView(self, max(0, start), min(stop, len(self)))
+
+    def set_summary(self, summary: Optional[str], summarized: int):
+        """Adopt a newer summary and drop the messages it now covers"""
+        if not summary or summarized <= self.summarized:
+            return
+        covered = min(summarized - self.summarized, len(self))
+        self._token_count -= sum(self._tokens[:covered])
+        del self._roles[:covered]
+        del self._contents[:covered]
+        del self._tokens[:covered]
+        self.summary = summary
+        self.summarized = summarized
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], summary: Optional[str] = None, summarized: int = 0) -> "ConversationHistory":
+        """Build from the chat_messages rows that follow a conversation's summary"""
+        history = cls()
+        history.summary = summary
+        history.summarized = summarized
+        for row in rows:
+            history.append(ASSISTANT if row["message_type"] == ASSISTANT else USER, row["content"])
+        return history
+
+    def to_cache(self) -> Dict[str, Any]:
+        return {
+            "roles": self._roles.decode("ascii"),
+            "contents": self._contents,
+            "tokens": self._tokens.tolist(),
+            "summary": self.summary,
+            "summarized": self.summarized,
+        }
+
+    @classmethod
+    def from_cache(cls, value: Any) -> "ConversationHistory":
+        """Load a cached history, including the older list-of-dicts format"""
+        history = cls()
+        if isinstance(value, dict):
+            history._roles = bytearray(value["roles"], "ascii")
+            history._contents = value["contents"]
+            history._tokens = array("I", value["tokens"])
+            history._token_count = sum(history._tokens)
+            history.summary = value.get("summary")
+            history.summarized = value.get("summarized", 0)
+        else:
+            for message in value:
+                history.append(message["role"], message["content"])
+        return history
@@ -49,4 +49,16 @@ class UserProfileUpdate(BaseModel):
     career_goals: Optional[List[str]] = None
     skills: Optional[List[str]] = None
     location: Optional[str] = None
-    bio: Optional[str] = None
\ No newline at end of file
+    bio: Optional[str] = None
+
+class RecommendationKind(str, Enum):
+    ROLE = "role"
+    LEARNING_PATH = "learning_path"
+
+class Recommendation(BaseModel):
+    id: str
+    kind: RecommendationKind
+    title: str
+    score: float
+    matched_skills: List[str] = []
+    missing_skills: List[str] = []
\ No newline at end of file
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Optional
+
+from app.config import settings
+
+# Both ids are interpolated into the upstream URL and the cache key
+ELEVENLABS_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
+class TTSRequest(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    text: str
+    voice_id: Optional[str] = Field(None, pattern=ELEVENLABS_ID_PATTERN)
+    model_id: Optional[str] = Field(None, pattern=ELEVENLABS_ID_PATTERN)
+
+    @field_validator("model_id")
+    @classmethod
+    def check_model_allowed(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None and value not in settings.tts_allowed_models:
+            raise ValueError(f"model_id must be one of: {', '.join(settings.tts_allowed_models)}")
+        return value
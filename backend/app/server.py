@@ -0,0 +1,108 @@
+"""Server entry points.
+
+Development runs a single uvicorn process with auto-reload. Production runs
+gunicorn as a process supervisor over uvicorn workers:
+
+- the app is imported once in the master (``preload_app``) with the GC
+  disabled, then frozen and the GC re-enabled before the first fork, so
+  workers share the imported modules and clients copy-on-write instead of
+  each loading their own
+- workers use uvloop and httptools
+- workers are recycled after ``max_requests`` (with jitter) to cap leaks
+- ``SIGTERM`` drains in-flight requests for ``graceful_timeout`` seconds
+
+Because the app is preloaded, ``kill -HUP <master pid>`` re-forks workers
+from the code already loaded in the master and does not pick up a deploy.
+Deploy new code with ``kill -USR2 <master pid>`` (start a new master next to
+the old one, then ``kill -TERM`` the old master) or a full restart.
+
+Compare worker counts with ``benchmarks/bench_server.py``, on a host with
+at least as many free cores as workers plus one for the benchmark client.
+"""
+import gc
+import logging
+import os
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def available_cpus() -> int:
+    """Number of CPU cores this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def worker_count() -> int:
+    """Configured worker count, defaulting to one per available core"""
+    return settings.workers if settings.workers > 0 else available_cpus()
+
+def run_development():
+    """Single process with auto-reload"""
+    uvicorn.run(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        reload=True,
+        log_level="info"
+    )
+
+def run_production():
+    """Multi-process gunicorn supervisor over tuned uvicorn workers"""
+    # gunicorn is POSIX-only, so it is imported here rather than at module level
+    from gunicorn.app.base import BaseApplication
+
+    class CareerWiseApplication(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # No collections while importing, so nothing is freed and
+            # reallocated between the import and the freeze below
+            gc.disable()
+            from app.main import app
+            return app
+
+    def when_ready(server):
+        # Move everything the master loaded out of the GC's reach, once, so
+        # collections in the workers do not touch (and un-share) its pages;
+        # workers forked from here on inherit the re-enabled GC
+        gc.freeze()
+        gc.enable()
+
+    workers = worker_count()
+    options = {
+        "bind": f"{settings.host}:{settings.port}",
+        "workers": workers,
+        "worker_class": "app.workers.TunedUvicornWorker",
+        "preload_app": True,
+        "backlog": settings.backlog,
+        "keepalive": settings.keepalive_timeout,
+        "max_requests": settings.max_requests,
+        "max_requests_jitter": settings.max_requests_jitter,
+        "graceful_timeout": settings.graceful_timeout,
+        "when_ready": when_ready,
+        "accesslog": None,
+        "loglevel": "info",
+    }
+
+    logger.info(f"Starting production server with {workers} workers on {options['bind']}")
+    CareerWiseApplication(options).run()
+
+def run():
+    """Run the server in the mode matching the environment"""
+    if settings.environment == "production":
+        run_production()
+    else:
+        run_development()
+
+if __name__ == "__main__":
+    run_production()
@@ -1,8 +1,10 @@
 import asyncio
 from groq import AsyncGroq
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple
 from app.config import settings
+from app.models.history import ConversationHistory
 from app.models.user import UserType
+from app.utils.profiling import profile_span
 import json
 import logging
 
@@ -12,6 +14,8 @@ class AIService:
     def __init__(self):
         self.client = AsyncGroq(api_key=settings.groq_api_key)
         self.model = settings.groq_model
+        self.max_tokens = 1000
+        self.history_window = 10
         
     def get_system_prompt(self, user_type: UserType) -> str:
         """Get dynamic system prompt based on user type"""
@@ -143,87 +147,135 @@ Always investigate:
         
         return prompts.get(user_type, prompts[UserType.STUDENT])
     
-    async def generate_response(
+    def build_messages(
+        self,
+        message: str,
+        conversation_history: ConversationHistory,
+        user_type: UserType
+    ) -> List[Dict[str, str]]:
+        """Build the message list sent to the API"""
+        messages = [
+            {"role": "system", "content": self.get_system_prompt(user_type)}
+        ]
+        
+        # Older turns are carried by the running summary. The summarizer folds
+        # messages only once more than this window follow the summary, so the
+        # window must cover them all, including before the first summary exists
+        window = self.history_window
+        if settings.summary_enabled:
+            window += 2 * settings.summary_every_turns
+        if conversation_history.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{conversation_history.summary}"
+            })
+        
+        # Add conversation history
+        messages.extend(conversation_history.tail(window).messages())
+        
+        # Add current user message
+        messages.append({"role": "user", "content": message})
+        
+        return messages
+    
+    async def complete(
         self, 
         message: str, 
-        conversation_history: List[Dict[str, str]], 
+        conversation_history: ConversationHistory, 
         user_type: UserType
     ) -> str:
-        """Generate AI response using Groq"""
+        """Generate AI response using Groq, raising on API errors"""
         
-        try:
-            # Build messages for the API
-            messages = [
-                {"role": "system", "content": self.get_system_prompt(user_type)}
-            ]
-            
-            # Add conversation history
-            for msg in conversation_history[-10:]:  # Keep last 10 messages for context
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-            
-            # Add current user message
-            messages.append({"role": "user", "content": message})
-            
-            # Generate response
+        with profile_span("groq.chat.completions"):
             response = await self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
-                max_tokens=1000,
+                messages=self.build_messages(message, conversation_history, user_type),
+                max_tokens=self.max_tokens,
                 temperature=0.7,
                 top_p=0.9,
                 stream=False
             )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            logger.error(f"Error generating AI response: {str(e)}")
-            return "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+        
+        return response.choices[0].message.content
+    
+    async def summarize(self, previous_summary: Optional[str], messages: Iterable[Tuple[str, str]]) -> str:
+        """Fold new turns into a running conversation summary with the cheaper summary model"""
+        transcript = "\n\n".join(f"{role.upper()}: {content}" for role, content in messages)
+        prompt = (
+            f"Current summary:\n{previous_summary or '(none yet)'}\n\n"
+            f"New messages:\n{transcript}\n\n"
+            "Rewrite the summary so it also covers the new messages. Keep the user's background, "
+            "goals, constraints, decisions and advice already given. Be concise and factual."
+        )
+        
+        with profile_span("groq.chat.completions.summary"):
+            response = await self.client.chat.completions.create(
+                model=settings.summary_model,
+                messages=[
+                    {"role": "system", "content": "You maintain running summaries of career coaching conversations."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=settings.summary_max_tokens,
+                temperature=0.2,
+                stream=False
+            )
+        
+        return response.choices[0].message.content.strip()
+    
+    async def generate_titles(self, exchanges: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """Title many conversations from their first exchange in one JSON-mode call"""
+        conversations = "\n\n".join(
+            f"[{i}]\nUSER: {message[:500]}\nASSISTANT: {response[:500]}"
+            for i, (message, response) in enumerate(exchanges)
+        )
+        
+        with profile_span("groq.chat.completions.titles"):
+            response = await self.client.chat.completions.create(
+                model=settings.titling_model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You write short titles (3 to 6 words, no quotes) for career coaching conversations. "
+                            'Reply with JSON: {"titles": [{"index": <number>, "title": "<title>"}]}, one entry per conversation.'
+                        )
+                    },
+                    {"role": "user", "content": conversations}
+                ],
+                max_tokens=min(self.max_tokens, 30 * len(exchanges) + 50),
+                temperature=0.3,
+                response_format={"type": "json_object"},
+                stream=False
+            )
+        
+        titles: List[Optional[str]] = [None] * len(exchanges)
+        for entry in json.loads(response.choices[0].message.content).get("titles", []):
+            index, title = entry.get("index"), entry.get("title")
+            if isinstance(index, int) and 0 <= index < len(exchanges) and isinstance(title, str) and title.strip():
+                titles[index] = title.strip().strip('"')[:100]
+        return titles
     
-    async def generate_streaming_response(
+    async def stream(
         self, 
         message: str, 
-        conversation_history: List[Dict[str, str]], 
+        conversation_history: ConversationHistory, 
         user_type: UserType
-    ):
-        """Generate streaming AI response using Groq"""
+    ) -> AsyncIterator[str]:
+        """Stream an AI response using Groq, raising on API errors"""
         
-        try:
-            # Build messages for the API
-            messages = [
-                {"role": "system", "content": self.get_system_prompt(user_type)}
-            ]
-            
-            # Add conversation history
-            for msg in conversation_history[-10:]:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-            
-            # Add current user message
-            messages.append({"role": "user", "content": message})
-            
-            # Generate streaming response
+        with profile_span("groq.chat.completions.stream_start"):
             stream = await self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
-                max_tokens=1000,
+                messages=self.build_messages(message, conversation_history, user_type),
+                max_tokens=self.max_tokens,
                 temperature=0.7,
                 top_p=0.9,
                 stream=True
             )
-            
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-                    
-        except Exception as e:
-            logger.error(f"Error generating streaming AI response: {str(e)}")
-            yield "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+        
+        async for chunk in stream:
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
 # Global AI service instance
 ai_service = AIService()
\ No newline at end of file
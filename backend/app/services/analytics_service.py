@@ -0,0 +1,268 @@
+"""Pre-aggregated chat analytics per user and per user type.
+
+Counters live in one Redis hash per scope and time bucket (UTC):
+
+    analytics:user:{user_id}:day:2026-10-19
+    analytics:user:{user_id}:week:2026-W42
+    analytics:user_type:{user_type}:day:2026-10-19
+    analytics:user_type:{user_type}:week:2026-W42
+
+Every exchange increments all four with HINCRBY in one pipelined round
+trip, and each hash expires ``analytics_retention_days`` after its last
+write. Reading a range is one pipelined HGETALL per bucket, so it costs
+O(buckets) regardless of how many messages the user has.
+
+A session is counted at the first exchange of a conversation. Token counts
+are the estimated tokens of the user message and the response. Latency is
+the time from request to complete response; the backfill approximates it
+as the gap between a user message and the assistant reply that follows.
+
+``backfill`` rebuilds the hashes from ``conversations`` and
+``chat_messages`` for every user owning a conversation. Only one backfill
+runs across all workers, guarded by ``analytics:backfill:lock`` (renewed
+as it progresses). Exchanges written while a backfill runs may be counted
+twice or not at all for the buckets it rewrites.
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.models.analytics import AnalyticsGranularity
+from app.models.chat import ConversationStatus
+from app.models.history import count_tokens
+from app.services.archive_service import archive_service
+from app.services.cache_service import cache_service
+from app.services.database_service import db_service
+from app.utils.profiling import profile_span
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_LOCK = "analytics:backfill:lock"
+
+# Delete the lock only while it still holds our token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+METRICS = ("sessions", "messages", "responses", "tokens_in", "tokens_out", "latency_ms")
+
+Rollups = Dict[str, Dict[str, int]]
+
+def bucket_name(granularity: AnalyticsGranularity, at: datetime) -> str:
+    if granularity == AnalyticsGranularity.WEEK:
+        year, week, _ = at.isocalendar()
+        return f"{year}-W{week:02d}"
+    return at.date().isoformat()
+
+def bucket_range(granularity: AnalyticsGranularity, days: int, now: Optional[datetime] = None) -> List[str]:
+    """Bucket names covering the last ``days`` days, oldest first"""
+    now = now or datetime.utcnow()
+    buckets: List[str] = []
+    for offset in range(days - 1, -1, -1):
+        name = bucket_name(granularity, now - timedelta(days=offset))
+        if not buckets or buckets[-1] != name:
+            buckets.append(name)
+    return buckets
+
+def rollup_key(scope: str, scope_id: str, granularity: AnalyticsGranularity, bucket: str) -> str:
+    return f"analytics:{scope}:{scope_id}:{granularity.value}:{bucket}"
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed.replace(tzinfo=None) - (parsed.utcoffset() or timedelta(0))
+
+class AnalyticsService:
+    def __init__(self):
+        self.redis_client = cache_service.redis_client
+        self.ttl = settings.analytics_retention_days * 86400
+        self._backfill: Optional[asyncio.Task] = None
+        self._release_lock = self.redis_client.register_script(RELEASE_LOCK_SCRIPT) if self.redis_client else None
+        self.backfill_status: Dict[str, Any] = {"state": "idle"}
+
+    def _keys(self, user_id: str, user_type: str, at: datetime) -> List[str]:
+        return [
+            rollup_key(scope, scope_id, granularity, bucket_name(granularity, at))
+            for scope, scope_id in (("user", user_id), ("user_type", user_type))
+            for granularity in AnalyticsGranularity
+        ]
+
+    async def record_exchange(
+        self,
+        user_id: str,
+        user_type: str,
+        message: str,
+        response: str,
+        latency_ms: float,
+        new_session: bool = False
+    ):
+        """Count one user message and its response in every rollup it belongs to"""
+        if not settings.analytics_enabled or not self.redis_client:
+            return
+
+        increments = {
+            "messages": 1,
+            "responses": 1,
+            "tokens_in": count_tokens(message),
+            "tokens_out": count_tokens(response),
+            "latency_ms": int(latency_ms),
+        }
+        if new_session:
+            increments["sessions"] = 1
+
+        try:
+            with profile_span("redis.pipeline"):
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key in self._keys(user_id, user_type, datetime.utcnow()):
+                    for metric, value in increments.items():
+                        pipe.hincrby(key, metric, value)
+                    pipe.expire(key, self.ttl)
+                pipe.execute()
+        except Exception as e:
+            logger.error(f"Error recording analytics: {str(e)}")
+
+    async def get_rollups(
+        self,
+        scope: str,
+        scope_id: str,
+        granularity: AnalyticsGranularity,
+        days: int
+    ) -> List[Dict[str, Any]]:
+        """Counters for each bucket in the last ``days`` days, oldest first"""
+        buckets = bucket_range(granularity, days)
+        counters: List[Dict[str, str]] = [{} for _ in buckets]
+        if self.redis_client:
+            try:
+                with profile_span("redis.pipeline"):
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    for bucket in buckets:
+                        pipe.hgetall(rollup_key(scope, scope_id, granularity, bucket))
+                    counters = pipe.execute()
+            except Exception as e:
+                logger.error(f"Error reading analytics: {str(e)}")
+
+        return [
+            {"bucket": bucket, **{metric: int(values.get(metric, 0)) for metric in METRICS}}
+            for bucket, values in zip(buckets, counters)
+        ]
+
+    @staticmethod
+    async def _message_pages(conversation: Dict[str, Any]):
+        if conversation.get("status") == ConversationStatus.ARCHIVED.value:
+            yield await archive_service.get_archived_messages(conversation["id"])
+            return
+        async for page in db_service.iter_conversation_messages(conversation["id"]):
+            yield page
+
+    async def _user_rollups(self, user_id: str) -> Rollups:
+        """Recompute one user's rollups from raw conversations and messages"""
+        rollups: Rollups = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+
+        def add(at: datetime, **increments: int):
+            for granularity in AnalyticsGranularity:
+                counters = rollups[f"{granularity.value}:{bucket_name(granularity, at)}"]
+                for metric, value in increments.items():
+                    counters[metric] += value
+
+        async for page in db_service.iter_user_conversations(user_id, page_size=settings.export_page_size):
+            for conversation in page:
+                pending_user_message = None
+                first = True
+                async for messages in self._message_pages(conversation):
+                    for message in messages:
+                        at = parse_timestamp(message["created_at"])
+                        if message["message_type"] != "assistant":
+                            pending_user_message = (at, message["content"])
+                            continue
+                        if pending_user_message is None:
+                            continue
+                        asked_at, content = pending_user_message
+                        add(
+                            asked_at,
+                            sessions=int(first),
+                            messages=1,
+                            responses=1,
+                            tokens_in=count_tokens(content),
+                            tokens_out=count_tokens(message["content"]),
+                            latency_ms=max(0, int((at - asked_at).total_seconds() * 1000)),
+                        )
+                        pending_user_message = None
+                        first = False
+        return rollups
+
+    def _write(self, scope: str, scope_id: str, rollups: Rollups):
+        """Replace the stored rollups of one scope; blocking, run it in a thread"""
+        with profile_span("redis.pipeline"):
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key in self.redis_client.scan_iter(match=f"analytics:{scope}:{scope_id}:*", count=1000):
+                pipe.delete(key)
+            for name, counters in rollups.items():
+                granularity, bucket = name.split(":", 1)
+                key = rollup_key(scope, scope_id, AnalyticsGranularity(granularity), bucket)
+                pipe.hset(key, mapping=counters)
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+
+    async def backfill(self, user_id: Optional[str] = None, lock_token: Optional[str] = None):
+        """Rebuild rollups from raw data: one user, or every user and user type"""
+        try:
+            if user_id:
+                await asyncio.to_thread(self._write, "user", user_id, await self._user_rollups(user_id))
+                self.backfill_status["users"] = 1
+            else:
+                by_user_type: Dict[str, Rollups] = defaultdict(lambda: defaultdict(lambda: dict.fromkeys(METRICS, 0)))
+                async for owners in db_service.iter_conversation_owners():
+                    user_types = await db_service.get_user_types(owners)
+                    for owner in owners:
+                        rollups = await self._user_rollups(owner)
+                        await asyncio.to_thread(self._write, "user", owner, rollups)
+                        type_rollups = by_user_type[user_types.get(owner) or "student"]
+                        for name, counters in rollups.items():
+                            for metric, value in counters.items():
+                                type_rollups[name][metric] += value
+                        self.backfill_status["users"] += 1
+                        await asyncio.to_thread(self.redis_client.expire, BACKFILL_LOCK, settings.analytics_backfill_lock_ttl)
+                for user_type, rollups in by_user_type.items():
+                    await asyncio.to_thread(self._write, "user_type", user_type, rollups)
+
+            self.backfill_status.update(state="succeeded", finished_at=datetime.utcnow().isoformat())
+            logger.info(f"Analytics backfill finished for {self.backfill_status['users']} users")
+        except Exception as e:
+            logger.error(f"Analytics backfill failed: {str(e)}")
+            self.backfill_status.update(state="failed", error=str(e), finished_at=datetime.utcnow().isoformat())
+        finally:
+            if lock_token:
+                try:
+                    await asyncio.to_thread(self._release_lock, keys=[BACKFILL_LOCK], args=[lock_token])
+                except Exception as e:
+                    logger.error(f"Error releasing analytics backfill lock: {str(e)}")
+
+    def _acquire_backfill_lock(self) -> Optional[str]:
+        """Token of the backfill lock if this worker got it, else None"""
+        token = uuid.uuid4().hex
+        try:
+            if self.redis_client.set(BACKFILL_LOCK, token, nx=True, ex=settings.analytics_backfill_lock_ttl):
+                return token
+        except Exception as e:
+            logger.error(f"Error acquiring analytics backfill lock: {str(e)}")
+        return None
+
+    def start_backfill(self, user_id: Optional[str] = None) -> bool:
+        """Run a backfill in the background; False if one is already running on any worker or Redis is unavailable"""
+        if not self.redis_client or (self._backfill and not self._backfill.done()):
+            return False
+        lock_token = self._acquire_backfill_lock()
+        if not lock_token:
+            return False
+        self.backfill_status = {"state": "running", "user_id": user_id, "users": 0, "started_at": datetime.utcnow().isoformat()}
+        self._backfill = asyncio.create_task(self.backfill(user_id, lock_token))
+        return True
+
+# Global analytics service instance
+analytics_service = AnalyticsService()
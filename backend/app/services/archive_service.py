@@ -0,0 +1,168 @@
+"""Cold storage for idle conversations.
+
+A conversation idle for ``archive_idle_days`` has its messages compressed
+into a single row of ``conversation_archives`` and removed from
+``chat_messages``. Its ``conversations`` row stays behind as a stub with
+status ``archived``, so it is still listed. Reads are served from the
+archive. Writing to the conversation rehydrates it back into the hot table.
+
+A conversation written to while it is being archived is left active: the
+status only flips if ``message_count`` and ``updated_at`` are unchanged
+since it was picked, and the flip is undone if ``chat_messages`` then
+holds more rows than the archive. It is retried in a later round.
+
+    create table conversation_archives (
+        conversation_id uuid primary key references conversations(id),
+        user_id uuid not null,
+        message_count integer not null,
+        payload text not null,          -- base64(zlib(json messages))
+        archived_at timestamptz not null
+    );
+"""
+import asyncio
+import base64
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.models.chat import ConversationStatus
+from app.services.cache_service import cache_service
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+class ArchiveService:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._rehydrating: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def compress(messages: List[Dict[str, Any]]) -> str:
+        raw = json.dumps(messages, separators=(",", ":"), default=str).encode()
+        return base64.b64encode(zlib.compress(raw, 6)).decode()
+
+    @staticmethod
+    def decompress(payload: str) -> List[Dict[str, Any]]:
+        return json.loads(zlib.decompress(base64.b64decode(payload)))
+
+    async def archive_conversation(self, conversation: Dict[str, Any]) -> bool:
+        """Move one conversation's messages into cold storage; False if it changed meanwhile"""
+        conversation_id = conversation["id"]
+        messages: List[Dict[str, Any]] = []
+        async for page in db_service.iter_conversation_messages(conversation_id):
+            messages.extend(page)
+
+        # Written in an order that never loses data if interrupted: the archive
+        # exists before the status flips, and both before messages are deleted
+        await db_service.create_conversation_archive({
+            "conversation_id": conversation_id,
+            "user_id": conversation["user_id"],
+            "message_count": len(messages),
+            "payload": self.compress(messages),
+            "archived_at": datetime.utcnow().isoformat()
+        })
+        if not await db_service.set_conversation_status_if_unchanged(conversation, ConversationStatus.ARCHIVED.value):
+            await db_service.delete_conversation_archive(conversation_id)
+            logger.info(f"Conversation {conversation_id} changed while archiving; skipped")
+            return False
+        # A message written before the flip but after the read would be hidden
+        if await db_service.count_conversation_messages(conversation_id) != len(messages):
+            await db_service.set_conversation_status(conversation_id, ConversationStatus.ACTIVE.value)
+            await db_service.delete_conversation_archive(conversation_id)
+            logger.info(f"Conversation {conversation_id} received messages while archiving; skipped")
+            return False
+        if messages:
+            await db_service.delete_conversation_messages(conversation_id, up_to=messages[-1]["created_at"])
+        await cache_service.delete(f"conversation:{conversation_id}")
+        await cache_service.invalidate_user_conversations(conversation["user_id"])
+        return True
+
+    async def archive_idle_conversations(self) -> int:
+        """Archive one batch of idle conversations; returns how many were archived"""
+        idle_before = (datetime.utcnow() - timedelta(days=settings.archive_idle_days)).isoformat()
+        conversations = await db_service.get_idle_conversations(idle_before, limit=settings.archive_batch_size)
+
+        archived = 0
+        for conversation in conversations:
+            try:
+                if await self.archive_conversation(conversation):
+                    archived += 1
+            except Exception as e:
+                logger.error(f"Error archiving conversation {conversation['id']}: {str(e)}")
+        if archived:
+            logger.info(f"Archived {archived} idle conversations")
+        return archived
+
+    async def get_archived_messages(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Read an archived conversation's messages without rehydrating it"""
+        archive = await db_service.get_conversation_archive(conversation_id)
+        return self.decompress(archive["payload"]) if archive else []
+
+    async def rehydrate(self, conversation_id: str):
+        """Restore an archived conversation to the hot tables"""
+        # Concurrent reopen requests share a single restore
+        pending = self._rehydrating.get(conversation_id)
+        if pending:
+            await pending
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._rehydrating[conversation_id] = future
+        try:
+            archive = await db_service.get_conversation_archive(conversation_id)
+            if archive:
+                await db_service.restore_messages(self.decompress(archive["payload"]))
+            await db_service.set_conversation_status(conversation_id, ConversationStatus.ACTIVE.value)
+            if archive:
+                await db_service.delete_conversation_archive(conversation_id)
+                await cache_service.invalidate_user_conversations(archive["user_id"])
+            logger.info(f"Rehydrated conversation {conversation_id}")
+            future.set_result(None)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._rehydrating[conversation_id]
+            if not future.done():
+                future.cancel()
+            elif not future.cancelled():
+                # Nobody else may be waiting; don't warn about an unretrieved exception
+                future.exception()
+
+    async def start(self):
+        """Start the periodic archiver"""
+        if settings.archive_enabled and not self._task:
+            self._task = asyncio.create_task(self._run(), name="conversation-archiver")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # With several workers, only the one holding the lock archives this round
+                if await self._acquire_lock():
+                    await self.archive_idle_conversations()
+            except Exception as e:
+                logger.error(f"Archiver run failed: {str(e)}")
+            await asyncio.sleep(settings.archive_interval)
+
+    async def _acquire_lock(self) -> bool:
+        if not cache_service.redis_client:
+            return True
+        try:
+            return bool(cache_service.redis_client.set(
+                "archiver:lock", "1", nx=True, ex=max(settings.archive_interval - 1, 1)
+            ))
+        except Exception as e:
+            logger.error(f"Error acquiring archiver lock: {str(e)}")
+            return False
+
+# Global archive service instance
+archive_service = ArchiveService()
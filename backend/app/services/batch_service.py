@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.models.batch import (
+    BatchItemResult, BatchItemStatus, BatchJobResponse, BatchJobStatus
+)
+from app.models.history import ConversationHistory
+from app.models.user import UserType
+from app.services.ai_service import ai_service
+from app.services.cache_service import cache_service
+from app.services.notification_service import notification_service
+from app.utils.profiling import profile_span
+
+logger = logging.getLogger(__name__)
+
+class BatchJob:
+    """In-memory state of a single batch job"""
+
+    def __init__(self, user_id: str, prompts: List[str], user_type: UserType, concurrency: int):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.prompts = prompts
+        self.user_type = user_type
+        self.concurrency = concurrency
+        self.results = [BatchItemResult(index=i) for i in range(len(prompts))]
+        self.next_index = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.finished_monotonic: Optional[float] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.prompts)
+
+    @property
+    def done(self) -> bool:
+        return self.completed + self.failed == self.total
+
+    @property
+    def status(self) -> BatchJobStatus:
+        if self.done:
+            if self.failed == 0:
+                return BatchJobStatus.COMPLETED
+            if self.completed == 0:
+                return BatchJobStatus.FAILED
+            return BatchJobStatus.PARTIAL
+        if self.completed or self.failed or any(r.status == BatchItemStatus.RUNNING for r in self.results):
+            return BatchJobStatus.RUNNING
+        return BatchJobStatus.QUEUED
+
+    def to_response(self, include_results: bool = True) -> BatchJobResponse:
+        return BatchJobResponse(
+            job_id=self.id,
+            status=self.status,
+            user_type=self.user_type.value,
+            total=self.total,
+            completed=self.completed,
+            failed=self.failed,
+            created_at=self.created_at,
+            finished_at=self.finished_at,
+            results=list(self.results) if include_results else None
+        )
+
+class BatchService:
+    """Runs batch prompt jobs on a bounded pool of asyncio workers.
+
+    Each job only ever has ``concurrency`` items in the shared queue, so one
+    large job cannot starve the others and workers never block on a job cap.
+
+    A job runs in the worker process that accepted it, but its state is
+    mirrored to Redis (``batch:job:{id}`` and ``batch:job:{id}:items``,
+    expiring ``batch_result_ttl`` after the last change) and every change is
+    signalled through the notification service, so any worker can serve
+    status and event requests. Without Redis, jobs are only visible to the
+    worker running them.
+    """
+
+    def __init__(self):
+        self.worker_count = settings.batch_worker_count
+        self.redis_client = cache_service.redis_client
+        self.jobs: Dict[str, BatchJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the worker pool"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"batch-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"Batch worker pool started with {self.worker_count} workers")
+
+    async def stop(self):
+        """Cancel the worker pool, failing the items of unfinished jobs"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Otherwise Redis would report them as running until they expire
+        for job in self.jobs.values():
+            if job.done:
+                continue
+            for item in job.results:
+                if item.status in (BatchItemStatus.PENDING, BatchItemStatus.RUNNING):
+                    item.status = BatchItemStatus.FAILED
+                    item.error = "Server shut down before this prompt ran"
+                    job.failed += 1
+            job.in_flight = 0
+            job.next_index = job.total
+            job.finished_at = datetime.utcnow()
+            job.finished_monotonic = time.monotonic()
+            self._save(job)
+            await notification_service.signal(f"batch:{job.id}")
+            logger.warning(f"Batch job {job.id} failed by shutdown: {job.completed} succeeded, {job.failed} failed")
+
+    async def submit(
+        self,
+        user_id: str,
+        prompts: List[str],
+        user_type: UserType,
+        concurrency: Optional[int] = None
+    ) -> BatchJob:
+        """Create a job and schedule its first items"""
+        await self.start()
+        self._prune_expired()
+
+        limit = min(concurrency or settings.batch_job_concurrency, settings.batch_job_concurrency)
+        job = BatchJob(user_id, prompts, user_type, max(limit, 1))
+        self.jobs[job.id] = job
+        self._save(job)
+        self._schedule(job)
+
+        logger.info(f"Batch job {job.id} queued with {job.total} prompts")
+        return job
+
+    async def get_job(self, job_id: str, user_id: str) -> Optional[BatchJobResponse]:
+        """Get a job owned by the given user, whichever worker runs it"""
+        self._prune_expired()
+        if self.redis_client:
+            try:
+                response = self._load(job_id, user_id)
+                if response is not None:
+                    return response
+            except Exception as e:
+                logger.error(f"Error loading batch job {job_id}: {str(e)}")
+
+        # Jobs this worker runs are still served if their Redis copy is missing
+        job = self.jobs.get(job_id)
+        if job and job.user_id == user_id:
+            return job.to_response()
+        return None
+
+    def watch(self, job_id: str) -> asyncio.Event:
+        """Event set whenever the job changes; release it with ``unwatch``"""
+        return notification_service.watch(f"batch:{job_id}")
+
+    def unwatch(self, job_id: str, event: asyncio.Event):
+        notification_service.unwatch(f"batch:{job_id}", event)
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"batch:job:{job_id}"
+
+    def _save(self, job: BatchJob, index: Optional[int] = None):
+        """Mirror the job, and one item or all of them, to Redis"""
+        if not self.redis_client:
+            return
+        items = job.results if index is None else [job.results[index]]
+        job_key = self._job_key(job.id)
+        try:
+            with profile_span("redis.pipeline"):
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.hset(job_key, mapping={
+                    "user_id": job.user_id,
+                    "user_type": job.user_type.value,
+                    "status": job.status.value,
+                    "total": job.total,
+                    "completed": job.completed,
+                    "failed": job.failed,
+                    "created_at": job.created_at.isoformat(),
+                    "finished_at": job.finished_at.isoformat() if job.finished_at else "",
+                })
+                pipe.hset(f"{job_key}:items", mapping={str(item.index): item.model_dump_json() for item in items})
+                pipe.expire(job_key, settings.batch_result_ttl)
+                pipe.expire(f"{job_key}:items", settings.batch_result_ttl)
+                pipe.execute()
+        except Exception as e:
+            logger.error(f"Error saving batch job {job.id}: {str(e)}")
+
+    def _load(self, job_id: str, user_id: str) -> Optional[BatchJobResponse]:
+        job_key = self._job_key(job_id)
+        with profile_span("redis.pipeline"):
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hgetall(job_key)
+            pipe.hgetall(f"{job_key}:items")
+            data, items = pipe.execute()
+        if not data or data["user_id"] != user_id:
+            return None
+
+        return BatchJobResponse(
+            job_id=job_id,
+            status=data["status"],
+            user_type=data["user_type"],
+            total=int(data["total"]),
+            completed=int(data["completed"]),
+            failed=int(data["failed"]),
+            created_at=data["created_at"],
+            finished_at=data["finished_at"] or None,
+            results=sorted(
+                (BatchItemResult.model_validate_json(item) for item in items.values()),
+                key=lambda item: item.index
+            )
+        )
+
+    async def _changed(self, job: BatchJob, index: int):
+        self._save(job, index)
+        await notification_service.signal(f"batch:{job.id}")
+
+    def _schedule(self, job: BatchJob):
+        """Top up the queue with the job's next items, up to its concurrency cap"""
+        while job.in_flight < job.concurrency and job.next_index < job.total:
+            self._queue.put_nowait((job, job.next_index))
+            job.next_index += 1
+            job.in_flight += 1
+
+    def _prune_expired(self):
+        """Drop finished jobs whose results are past retention"""
+        cutoff = time.monotonic() - settings.batch_result_ttl
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_monotonic is not None and job.finished_monotonic < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job, index = await self._queue.get()
+            try:
+                await self._run_item(job, index)
+            except Exception as e:
+                logger.error(f"Batch worker error on job {job.id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_item(self, job: BatchJob, index: int):
+        item = job.results[index]
+        item.status = BatchItemStatus.RUNNING
+        await self._changed(job, index)
+
+        try:
+            item.response = await asyncio.wait_for(
+                ai_service.complete(
+                    message=job.prompts[index],
+                    conversation_history=ConversationHistory(),
+                    user_type=job.user_type
+                ),
+                timeout=settings.batch_item_timeout
+            )
+            item.status = BatchItemStatus.SUCCEEDED
+            job.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Batch job {job.id} item {index} failed: {str(e)}")
+            item.status = BatchItemStatus.FAILED
+            item.error = str(e) or type(e).__name__
+            job.failed += 1
+        finally:
+            job.in_flight -= 1
+
+        if job.done:
+            job.finished_at = datetime.utcnow()
+            job.finished_monotonic = time.monotonic()
+            logger.info(f"Batch job {job.id} finished: {job.completed} succeeded, {job.failed} failed")
+        else:
+            self._schedule(job)
+        await self._changed(job, index)
+
+        if job.done:
+            await notification_service.publish(job.user_id, "batch.finished", {
+                "job_id": job.id,
+                "status": job.status.value,
+                "completed": job.completed,
+                "failed": job.failed,
+            })
+
+# Global batch service instance
+batch_service = BatchService()
@@ -1,8 +1,11 @@
 import redis
+import hashlib
 import json
 import logging
 from typing import Any, Optional
 from app.config import settings
+from app.models.history import ConversationHistory
+from app.utils.profiling import profile_span
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +26,8 @@ class CacheService:
             return None
             
         try:
-            value = self.redis_client.get(key)
+            with profile_span("redis.get"):
+                value = self.redis_client.get(key)
             if value:
                 return json.loads(value)
             return None
@@ -38,7 +42,8 @@ class CacheService:
             
         try:
             serialized_value = json.dumps(value, default=str)
-            return self.redis_client.setex(key, expire, serialized_value)
+            with profile_span("redis.setex"):
+                return self.redis_client.setex(key, expire, serialized_value)
         except Exception as e:
             logger.error(f"Error setting cache: {str(e)}")
             return False
@@ -49,7 +54,8 @@ class CacheService:
             return False
             
         try:
-            return bool(self.redis_client.delete(key))
+            with profile_span("redis.delete"):
+                return bool(self.redis_client.delete(key))
         except Exception as e:
             logger.error(f"Error deleting from cache: {str(e)}")
             return False
@@ -62,13 +68,51 @@ class CacheService:
         """Cache user profile for 1 hour"""
         return await self.set(f"user_profile:{user_id}", profile, expire=3600)
     
-    async def get_conversation_history(self, conversation_id: str) -> Optional[Any]:
+    async def get_conversation_history(self, conversation_id: str) -> Optional[ConversationHistory]:
         """Get conversation history from cache"""
-        return await self.get(f"conversation:{conversation_id}")
+        value = await self.get(f"conversation:{conversation_id}")
+        return ConversationHistory.from_cache(value) if value else None
     
-    async def set_conversation_history(self, conversation_id: str, messages: Any) -> bool:
+    async def set_conversation_history(self, conversation_id: str, history: ConversationHistory) -> bool:
         """Cache conversation history for 30 minutes"""
-        return await self.set(f"conversation:{conversation_id}", messages, expire=1800)
+        return await self.set(f"conversation:{conversation_id}", history.to_cache(), expire=1800)
+    
+    async def invalidate_conversation_history(self, conversation_id: str) -> bool:
+        """Drop a cached conversation history so the next read rebuilds it"""
+        return await self.delete(f"conversation:{conversation_id}")
+    
+    async def get_user_conversations(self, user_id: str) -> Optional[Any]:
+        """Get a user's conversation list from cache"""
+        return await self.get(f"user_conversations:{user_id}")
+    
+    async def set_user_conversations(self, user_id: str, conversations: Any) -> bool:
+        """Cache a user's conversation list for 5 minutes"""
+        return await self.set(f"user_conversations:{user_id}", conversations, expire=300)
+    
+    async def invalidate_user_conversations(self, user_id: str) -> bool:
+        """Drop a user's cached conversation list after it changes"""
+        return await self.delete(f"user_conversations:{user_id}")
+    
+    @staticmethod
+    def _simple_answer_key(user_type: str, message: str) -> str:
+        normalized = " ".join(message.lower().split())
+        return f"simple_answer:{user_type}:{hashlib.sha256(normalized.encode()).hexdigest()}"
+    
+    async def get_simple_answer(self, user_type: str, message: str) -> Optional[str]:
+        """Get a cached demo chat answer"""
+        return await self.get(self._simple_answer_key(user_type, message))
+    
+    async def set_simple_answer(self, user_type: str, message: str, answer: str) -> bool:
+        """Cache a demo chat answer for 1 day"""
+        return await self.set(self._simple_answer_key(user_type, message), answer, expire=86400)
+    
+    async def get_recommendations(self, user_id: str, variant: str) -> Optional[Any]:
+        """Get cached recommendations for a profile version"""
+        return await self.get(f"recommendations:{user_id}:{variant}")
+    
+    async def set_recommendations(self, user_id: str, variant: str, recommendations: Any) -> bool:
+        """Cache recommendations for a profile version for 1 day"""
+        return await self.set(f"recommendations:{user_id}:{variant}", recommendations, expire=86400)
 
 # Global cache service instance
 cache_service = CacheService()
\ No newline at end of file
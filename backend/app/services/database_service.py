@@ -1,12 +1,17 @@
 from supabase import create_client, Client
 from app.config import settings
-from typing import List, Dict, Any, Optional
+from app.utils.profiling import profile_span
+from typing import AsyncIterator, List, Dict, Any, Optional, Set, Tuple
+import asyncio
 import uuid
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Conversation list rows leave out large columns such as the running summary
+CONVERSATION_LIST_COLUMNS = 'id,user_id,title,status,user_type,message_count,created_at,updated_at'
+
 class DatabaseService:
     def __init__(self):
         self.supabase: Client = create_client(
@@ -14,6 +19,15 @@ class DatabaseService:
             settings.supabase_service_key
         )
     
+    async def _execute(self, query, operation: str):
+        """Execute a PostgREST query off the event loop.
+
+        supabase-py is synchronous; running it in a worker thread keeps the
+        loop responsive and lets independent queries overlap under gather().
+        """
+        with profile_span(f"supabase.{operation}"):
+            return await asyncio.to_thread(query.execute)
+    
     async def create_user_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new user profile"""
         try:
@@ -22,7 +36,7 @@ class DatabaseService:
             profile_data['created_at'] = datetime.utcnow().isoformat()
             profile_data['updated_at'] = datetime.utcnow().isoformat()
             
-            result = self.supabase.table('user_profiles').insert(profile_data).execute()
+            result = await self._execute(self.supabase.table('user_profiles').insert(profile_data), "user_profiles.insert")
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error creating user profile: {str(e)}")
@@ -31,7 +45,7 @@ class DatabaseService:
     async def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile by user_id"""
         try:
-            result = self.supabase.table('user_profiles').select('*').eq('user_id', user_id).execute()
+            result = await self._execute(self.supabase.table('user_profiles').select('*').eq('user_id', user_id), "user_profiles.select")
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error getting user profile: {str(e)}")
@@ -42,7 +56,7 @@ class DatabaseService:
         try:
             profile_data['updated_at'] = datetime.utcnow().isoformat()
             
-            result = self.supabase.table('user_profiles').update(profile_data).eq('user_id', user_id).execute()
+            result = await self._execute(self.supabase.table('user_profiles').update(profile_data).eq('user_id', user_id), "user_profiles.update")
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error updating user profile: {str(e)}")
@@ -58,7 +72,7 @@ class DatabaseService:
             conversation_data['message_count'] = 0
             conversation_data['status'] = 'active'
             
-            result = self.supabase.table('conversations').insert(conversation_data).execute()
+            result = await self._execute(self.supabase.table('conversations').insert(conversation_data), "conversations.insert")
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error creating conversation: {str(e)}")
@@ -67,7 +81,7 @@ class DatabaseService:
     async def get_conversation(self, conversation_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """Get conversation by ID and user_id"""
         try:
-            result = self.supabase.table('conversations').select('*').eq('id', conversation_id).eq('user_id', user_id).execute()
+            result = await self._execute(self.supabase.table('conversations').select('*').eq('id', conversation_id).eq('user_id', user_id), "conversations.select")
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error getting conversation: {str(e)}")
@@ -76,7 +90,7 @@ class DatabaseService:
     async def get_user_conversations(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get all conversations for a user"""
         try:
-            result = self.supabase.table('conversations').select('*').eq('user_id', user_id).eq('status', 'active').order('updated_at', desc=True).limit(limit).execute()
+            result = await self._execute(self.supabase.table('conversations').select(CONVERSATION_LIST_COLUMNS).eq('user_id', user_id).in_('status', ['active', 'archived']).order('updated_at', desc=True).limit(limit), "conversations.select")
             return result.data or []
         except Exception as e:
             logger.error(f"Error getting user conversations: {str(e)}")
@@ -88,7 +102,7 @@ class DatabaseService:
             message_data['id'] = str(uuid.uuid4())
             message_data['created_at'] = datetime.utcnow().isoformat()
             
-            result = self.supabase.table('chat_messages').insert(message_data).execute()
+            result = await self._execute(self.supabase.table('chat_messages').insert(message_data), "chat_messages.insert")
             
             # Update conversation message count and timestamp
             await self.update_conversation_stats(message_data['conversation_id'])
@@ -98,30 +112,207 @@ class DatabaseService:
             logger.error(f"Error creating message: {str(e)}")
             raise
     
-    async def get_conversation_messages(self, conversation_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get messages for a conversation"""
+    async def get_conversation_messages(self, conversation_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get messages for a conversation, skipping the first offset"""
         try:
-            result = self.supabase.table('chat_messages').select('*').eq('conversation_id', conversation_id).order('created_at', desc=False).limit(limit).execute()
+            result = await self._execute(self.supabase.table('chat_messages').select('*').eq('conversation_id', conversation_id).order('created_at', desc=False).range(offset, offset + limit - 1), "chat_messages.select")
             return result.data or []
         except Exception as e:
             logger.error(f"Error getting conversation messages: {str(e)}")
             return []
     
+    async def get_recent_messages(self, conversation_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the latest messages of a conversation, oldest first"""
+        try:
+            result = await self._execute(self.supabase.table('chat_messages').select('*').eq('conversation_id', conversation_id).order('created_at', desc=True).limit(limit), "chat_messages.select")
+            return list(reversed(result.data or []))
+        except Exception as e:
+            logger.error(f"Error getting recent messages: {str(e)}")
+            return []
+    
     async def update_conversation_stats(self, conversation_id: str):
         """Update conversation message count and timestamp"""
         try:
             # Get current message count
-            result = self.supabase.table('chat_messages').select('id', count='exact').eq('conversation_id', conversation_id).execute()
+            result = await self._execute(self.supabase.table('chat_messages').select('id', count='exact').eq('conversation_id', conversation_id), "chat_messages.select")
             message_count = result.count or 0
             
             # Update conversation
-            self.supabase.table('conversations').update({
-                'message_count': message_count,
-                'updated_at': datetime.utcnow().isoformat()
-            }).eq('id', conversation_id).execute()
+            await self._execute(
+                self.supabase.table('conversations').update({
+                    'message_count': message_count,
+                    'updated_at': datetime.utcnow().isoformat()
+                }).eq('id', conversation_id),
+                "conversations.update"
+            )
             
         except Exception as e:
             logger.error(f"Error updating conversation stats: {str(e)}")
+    
+    async def iter_conversation_messages(
+        self,
+        conversation_id: str,
+        page_size: int = 500,
+        after: Optional[Tuple[str, str]] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of a conversation's messages in order, using keyset pagination on (created_at, id)"""
+        cursor = after
+        while True:
+            query = self.supabase.table('chat_messages').select('*').eq('conversation_id', conversation_id)
+            if cursor:
+                created_at, message_id = cursor
+                query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{message_id})')
+            # A single order parameter with both keys, as PostgREST expects
+            result = await self._execute(query.order('created_at,id').limit(page_size), "chat_messages.select")
+            rows = result.data or []
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            cursor = (rows[-1]['created_at'], rows[-1]['id'])
+    
+    async def iter_user_conversations(
+        self,
+        user_id: str,
+        page_size: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of all of a user's conversations, oldest first, using keyset pagination on (created_at, id)"""
+        cursor = after
+        while True:
+            query = self.supabase.table('conversations').select('*').eq('user_id', user_id).neq('status', 'deleted')
+            if cursor:
+                created_at, conversation_id = cursor
+                query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{conversation_id})')
+            result = await self._execute(query.order('created_at,id').limit(page_size), "conversations.select")
+            rows = result.data or []
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            cursor = (rows[-1]['created_at'], rows[-1]['id'])
+    
+    async def iter_conversation_owners(self, page_size: int = 500) -> AsyncIterator[List[str]]:
+        """Yield pages of distinct user ids owning at least one conversation, using keyset pagination on user_id"""
+        last_user_id = None
+        while True:
+            query = self.supabase.table('conversations').select('user_id')
+            if last_user_id:
+                query = query.gt('user_id', last_user_id)
+            result = await self._execute(query.order('user_id').limit(page_size), "conversations.select")
+            rows = result.data or []
+            if rows:
+                # A full page may repeat one owner; the next page starts after it either way
+                yield list(dict.fromkeys(row['user_id'] for row in rows))
+            if len(rows) < page_size:
+                return
+            last_user_id = rows[-1]['user_id']
+    
+    async def get_user_types(self, user_ids: List[str]) -> Dict[str, str]:
+        """user_id -> user_type for the given users that have a profile"""
+        if not user_ids:
+            return {}
+        result = await self._execute(
+            self.supabase.table('user_profiles').select('user_id,user_type').in_('user_id', user_ids),
+            "user_profiles.select"
+        )
+        return {row['user_id']: row['user_type'] for row in result.data or []}
+    
+    async def update_conversation_titles(self, titles: Dict[str, str], default_title: str) -> Set[str]:
+        """Set generated titles on conversations still carrying the default title, returning the ids updated"""
+        results = await asyncio.gather(*[
+            self._execute(
+                self.supabase.table('conversations').update({'title': title}).eq('id', conversation_id).eq('title', default_title),
+                "conversations.update"
+            )
+            for conversation_id, title in titles.items()
+        ], return_exceptions=True)
+        
+        updated = set()
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error updating conversation title: {str(result)}")
+            else:
+                updated.update(row['id'] for row in result.data or [])
+        return updated
+    
+    async def update_conversation_summary(self, conversation_id: str, summary: str, summary_message_count: int):
+        """Store a conversation's running summary and how many messages it covers"""
+        try:
+            await self._execute(
+                self.supabase.table('conversations').update({
+                    'summary': summary,
+                    'summary_message_count': summary_message_count
+                }).eq('id', conversation_id).lt('summary_message_count', summary_message_count),
+                "conversations.update"
+            )
+        except Exception as e:
+            logger.error(f"Error updating conversation summary: {str(e)}")
+            raise
+    
+    async def get_idle_conversations(self, idle_before: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get active conversations not updated since idle_before"""
+        try:
+            result = await self._execute(self.supabase.table('conversations').select('id, user_id, status, message_count, updated_at').eq('status', 'active').lt('updated_at', idle_before).order('updated_at').limit(limit), "conversations.select")
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Error getting idle conversations: {str(e)}")
+            return []
+    
+    async def set_conversation_status(self, conversation_id: str, status: str):
+        """Set a conversation's status without touching its updated_at ordering"""
+        await self._execute(self.supabase.table('conversations').update({'status': status}).eq('id', conversation_id), "conversations.update")
+    
+    async def set_conversation_status_if_unchanged(self, conversation: Dict[str, Any], status: str) -> bool:
+        """Set a conversation's status only if its status, message_count and updated_at are as given"""
+        result = await self._execute(
+            self.supabase.table('conversations').update({'status': status})
+            .eq('id', conversation['id'])
+            .eq('status', conversation['status'])
+            .eq('message_count', conversation['message_count'])
+            .eq('updated_at', conversation['updated_at']),
+            "conversations.update"
+        )
+        return bool(result.data)
+    
+    async def count_conversation_messages(self, conversation_id: str) -> int:
+        """Number of a conversation's rows in chat_messages"""
+        result = await self._execute(
+            self.supabase.table('chat_messages').select('id', count='exact').eq('conversation_id', conversation_id).limit(1),
+            "chat_messages.select"
+        )
+        return result.count or 0
+    
+    async def create_conversation_archive(self, archive_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Store (or replace) the compressed archive of a conversation"""
+        try:
+            result = await self._execute(self.supabase.table('conversation_archives').upsert(archive_data, on_conflict='conversation_id'), "conversation_archives.upsert")
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Error creating conversation archive: {str(e)}")
+            raise
+    
+    async def get_conversation_archive(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Get the compressed archive of a conversation"""
+        try:
+            result = await self._execute(self.supabase.table('conversation_archives').select('*').eq('conversation_id', conversation_id), "conversation_archives.select")
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Error getting conversation archive: {str(e)}")
+            return None
+    
+    async def delete_conversation_archive(self, conversation_id: str):
+        """Delete the archive of a conversation"""
+        await self._execute(self.supabase.table('conversation_archives').delete().eq('conversation_id', conversation_id), "conversation_archives.delete")
+    
+    async def delete_conversation_messages(self, conversation_id: str, up_to: str):
+        """Delete a conversation's messages created at or before up_to"""
+        await self._execute(self.supabase.table('chat_messages').delete().eq('conversation_id', conversation_id).lte('created_at', up_to), "chat_messages.delete")
+    
+    async def restore_messages(self, messages: List[Dict[str, Any]]):
+        """Bulk insert previously archived messages, ignoring ones already present"""
+        if messages:
+            await self._execute(self.supabase.table('chat_messages').upsert(messages, on_conflict='id', ignore_duplicates=True), "chat_messages.upsert")
 
 # Global database service instance
 db_service = DatabaseService()
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""Streaming export of a user's full chat history.
+
+Conversations and their messages are walked with keyset pagination and
+written out as they are read, so memory stays bounded by one page. After
+each conversation the export emits a cursor; passing it back resumes the
+export from the next conversation.
+
+Exports are throttled so they cannot starve live chat traffic. Each worker
+runs at most ``export_max_concurrent`` exports, and each export reads at
+most ``export_pages_per_second`` pages from the database.
+"""
+import asyncio
+import base64
+import time
+import uuid
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.config import settings
+from app.models.chat import ConversationStatus
+from app.services.archive_service import archive_service
+from app.services.database_service import db_service
+
+class ExportBusyError(Exception):
+    """Too many exports are already running in this worker"""
+
+class InvalidCursorError(ValueError):
+    """The resume cursor could not be decoded"""
+
+def encode_cursor(conversation: Dict[str, Any]) -> str:
+    raw = orjson.dumps([conversation["created_at"], conversation["id"]], default=str)
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Parse a cursor, re-serialising both parts as they go into a PostgREST filter"""
+    try:
+        created_at, conversation_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at).isoformat(), str(uuid.UUID(conversation_id))
+    except Exception:
+        raise InvalidCursorError("Invalid export cursor")
+
+def _line(record: Dict[str, Any]) -> bytes:
+    return orjson.dumps(record, default=str, option=orjson.OPT_APPEND_NEWLINE)
+
+class _Pacer:
+    """Spaces out database page reads to a fixed rate"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1 / per_second if per_second > 0 else 0
+        self._next = time.monotonic()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next = max(self._next, time.monotonic()) + self.interval
+
+class _ZipBuffer:
+    """Write-only, non-seekable sink that zipfile streams into"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ExportService:
+    def __init__(self):
+        self.active = 0
+
+    def acquire(self) -> Callable[[], None]:
+        """Reserve an export slot in this worker and return its release callback"""
+        if self.active >= settings.export_max_concurrent:
+            raise ExportBusyError("Too many exports in progress, please retry shortly")
+        self.active += 1
+
+        def release():
+            self.active -= 1
+        return release
+
+    async def _message_pages(self, conversation: Dict[str, Any], pacer: _Pacer) -> AsyncIterator[List[Dict[str, Any]]]:
+        if conversation.get("status") == ConversationStatus.ARCHIVED.value:
+            await pacer.wait()
+            yield await archive_service.get_archived_messages(conversation["id"])
+            return
+
+        pages = db_service.iter_conversation_messages(conversation["id"], page_size=settings.export_page_size)
+        while True:
+            await pacer.wait()
+            try:
+                page = await pages.__anext__()
+            except StopAsyncIteration:
+                return
+            yield page
+
+    async def _conversations(self, user_id: str, cursor: Optional[str], pacer: _Pacer) -> AsyncIterator[Dict[str, Any]]:
+        after = decode_cursor(cursor) if cursor else None
+        pages = db_service.iter_user_conversations(user_id, page_size=settings.export_page_size, after=after)
+        while True:
+            await pacer.wait()
+            try:
+                page = await pages.__anext__()
+            except StopAsyncIteration:
+                return
+            for conversation in page:
+                yield conversation
+
+    async def ndjson(self, user_id: str, cursor: Optional[str] = None) -> AsyncIterator[bytes]:
+        """One JSON record per line: conversation, its messages, then a resume cursor"""
+        pacer = _Pacer(settings.export_pages_per_second)
+        async for conversation in self._conversations(user_id, cursor, pacer):
+            yield _line({"type": "conversation", "data": conversation})
+            async for page in self._message_pages(conversation, pacer):
+                yield b"".join(_line({"type": "message", "data": message}) for message in page)
+            yield _line({"type": "cursor", "cursor": encode_cursor(conversation)})
+        yield _line({"type": "end"})
+
+    async def zip(self, user_id: str, cursor: Optional[str] = None) -> AsyncIterator[bytes]:
+        """A zip with one JSON file per conversation, each carrying its resume cursor"""
+        pacer = _Pacer(settings.export_pages_per_second)
+        buffer = _ZipBuffer()
+        exported = []
+        with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            async for conversation in self._conversations(user_id, cursor, pacer):
+                with archive.open(f"conversations/{conversation['id']}.json", mode="w") as entry:
+                    entry.write(b'{"conversation":')
+                    entry.write(orjson.dumps(conversation, default=str))
+                    entry.write(b',"messages":[')
+                    first = True
+                    async for page in self._message_pages(conversation, pacer):
+                        for message in page:
+                            entry.write((b"" if first else b",") + orjson.dumps(message, default=str))
+                            first = False
+                        yield buffer.drain()
+                    entry.write(b'],"resume_cursor":' + orjson.dumps(encode_cursor(conversation)) + b"}")
+                exported.append(conversation["id"])
+                yield buffer.drain()
+
+            archive.writestr("manifest.json", orjson.dumps({
+                "user_id": user_id,
+                "resumed_from": cursor,
+                "conversations": exported,
+            }))
+        yield buffer.drain()
+
+# Global export service instance
+export_service = ExportService()
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, AsyncContextManager, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+class IdempotencyConflictError(Exception):
+    """The key was already used for a request with a different payload"""
+
+class IdempotencyInProgressError(Exception):
+    """The original request is still running and did not finish in time"""
+
+class IdempotencyService:
+    """Records the outcome of write requests by Idempotency-Key.
+
+    The first request claims the key in Redis with an ``in_progress`` record
+    and later stores its response under the same key. A retry either gets
+    that stored response or waits for the original to finish. Waiting
+    attaches to a local future when the original runs in this worker and
+    polls Redis otherwise.
+    """
+
+    def __init__(self):
+        self.redis_client = cache_service.redis_client
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Fallback store when Redis is unavailable: key -> (expires_at, record)
+        self._local: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, default=str, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def _record_key(user_id: str, key: str) -> str:
+        return f"idempotency:{user_id}:{key}"
+
+    async def begin(
+        self,
+        user_id: str,
+        key: str,
+        fingerprint: str,
+        waiting: Optional[Callable[[], AsyncContextManager]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Claim the key, or return the stored response of a previous request.
+
+        Returns None when the caller owns the key and must run the request,
+        then call ``complete`` or ``fail``. ``waiting`` is entered while the
+        caller waits for another request holding the key.
+        """
+        record_key = self._record_key(user_id, key)
+        claim = {"state": "in_progress", "fingerprint": fingerprint}
+
+        if self._claim(record_key, claim):
+            self._inflight[record_key] = asyncio.get_running_loop().create_future()
+            return None
+
+        record = self._get(record_key)
+        if record is None:
+            # The previous owner failed and released the key between our calls
+            return await self.begin(user_id, key, fingerprint, waiting)
+        if record["fingerprint"] != fingerprint:
+            raise IdempotencyConflictError("Idempotency-Key was reused with a different request")
+        if record["state"] == "completed":
+            return record["response"]
+
+        if waiting is None:
+            return await self._wait(user_id, key, fingerprint)
+        async with waiting():
+            return await self._wait(user_id, key, fingerprint)
+
+    async def complete(self, user_id: str, key: str, fingerprint: str, response: Dict[str, Any]):
+        """Store the response for replay and wake up attached retries"""
+        record_key = self._record_key(user_id, key)
+        record = {"state": "completed", "fingerprint": fingerprint, "response": response}
+        self._put(record_key, record, settings.idempotency_ttl)
+
+        future = self._inflight.pop(record_key, None)
+        if future and not future.done():
+            future.set_result(response)
+
+    async def fail(self, user_id: str, key: str):
+        """Release the key so a retry runs the request again"""
+        record_key = self._record_key(user_id, key)
+        self._delete(record_key)
+
+        future = self._inflight.pop(record_key, None)
+        if future and not future.done():
+            future.set_result(None)
+
+    async def _wait(self, user_id: str, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        record_key = self._record_key(user_id, key)
+        deadline = time.monotonic() + settings.idempotency_wait_timeout
+
+        local = self._inflight.get(record_key)
+        if local:
+            try:
+                response = await asyncio.wait_for(asyncio.shield(local), settings.idempotency_wait_timeout)
+            except asyncio.TimeoutError:
+                raise IdempotencyInProgressError("Original request is still in progress")
+            if response is None:
+                # The original failed; this retry becomes the new owner
+                return await self.begin(user_id, key, fingerprint)
+            return response
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+            record = self._get(record_key)
+            if record is None:
+                return await self.begin(user_id, key, fingerprint)
+            if record["state"] == "completed":
+                return record["response"]
+        raise IdempotencyInProgressError("Original request is still in progress")
+
+    def _claim(self, record_key: str, record: Dict[str, Any]) -> bool:
+        if self.redis_client:
+            try:
+                return bool(self.redis_client.set(
+                    record_key, json.dumps(record), nx=True, ex=settings.idempotency_lock_ttl
+                ))
+            except Exception as e:
+                logger.error(f"Error claiming idempotency key: {str(e)}")
+        if self._get_local(record_key) is not None:
+            return False
+        self._put_local(record_key, record, settings.idempotency_lock_ttl)
+        return True
+
+    def _get(self, record_key: str) -> Optional[Dict[str, Any]]:
+        if self.redis_client:
+            try:
+                value = self.redis_client.get(record_key)
+                return json.loads(value) if value else None
+            except Exception as e:
+                logger.error(f"Error reading idempotency key: {str(e)}")
+        return self._get_local(record_key)
+
+    def _put(self, record_key: str, record: Dict[str, Any], ttl: int):
+        if self.redis_client:
+            try:
+                self.redis_client.setex(record_key, ttl, json.dumps(record, default=str))
+                return
+            except Exception as e:
+                logger.error(f"Error storing idempotency key: {str(e)}")
+        self._put_local(record_key, record, ttl)
+
+    def _delete(self, record_key: str):
+        if self.redis_client:
+            try:
+                self.redis_client.delete(record_key)
+                return
+            except Exception as e:
+                logger.error(f"Error releasing idempotency key: {str(e)}")
+        self._local.pop(record_key, None)
+
+    def _get_local(self, record_key: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(record_key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._local[record_key]
+            return None
+        return entry[1]
+
+    def _put_local(self, record_key: str, record: Dict[str, Any], ttl: int):
+        if len(self._local) > 10_000:
+            now = time.monotonic()
+            self._local = {k: v for k, v in self._local.items() if v[0] > now}
+        self._local[record_key] = (time.monotonic() + ttl, record)
+
+# Global idempotency service instance
+idempotency_service = IdempotencyService()
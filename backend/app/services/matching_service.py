@@ -0,0 +1,133 @@
+"""Career and learning-path matching over user profiles.
+
+The catalog in ``app/data/career_catalog.json`` is compiled once into
+row-normalised NumPy matrices: IDF-weighted skills, industries, title
+keywords and experience levels. Scoring a profile is then one
+matrix-vector product per signal, followed by an ``argpartition`` top-k.
+No LLM call is involved.
+"""
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.models.user import ExperienceLevel
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "career_catalog.json")
+
+SKILL_WEIGHT = 0.55
+INDUSTRY_WEIGHT = 0.2
+GOAL_WEIGHT = 0.15
+EXPERIENCE_WEIGHT = 0.1
+
+STOPWORDS = {"a", "an", "and", "as", "become", "for", "get", "in", "into", "my", "of", "on", "the", "to", "with"}
+LEVELS = [level.value for level in ExperienceLevel]
+
+def normalize(term: str) -> str:
+    return " ".join(term.lower().split())
+
+def keywords(text: str) -> List[str]:
+    return [word for word in re.findall(r"[a-z0-9+#/]+", text.lower()) if word not in STOPWORDS]
+
+def _row_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+class MatchingService:
+    def __init__(self, catalog_path: str = CATALOG_PATH):
+        with open(catalog_path) as f:
+            self.items: List[Dict[str, Any]] = json.load(f)["items"]
+
+        self.skill_index = self._vocabulary(normalize(s) for item in self.items for s in item["skills"])
+        self.industry_index = self._vocabulary(normalize(i) for item in self.items for i in item["industries"])
+        self.keyword_index = self._vocabulary(k for item in self.items for k in keywords(item["title"]))
+
+        skills = self._one_hot([item["skills"] for item in self.items], self.skill_index, normalize)
+        # Rare skills say more about a role than ones every role lists
+        document_frequency = skills.sum(axis=0)
+        self.idf = np.log((1 + len(self.items)) / (1 + document_frequency)).astype(np.float32) + 1
+        self.skills = _row_normalize(skills * self.idf)
+        self.industries = _row_normalize(self._one_hot([item["industries"] for item in self.items], self.industry_index, normalize))
+        self.keywords = _row_normalize(self._one_hot([keywords(item["title"]) for item in self.items], self.keyword_index))
+        self.levels = self._one_hot([item["experience_levels"] for item in self.items], {level: i for i, level in enumerate(LEVELS)})
+        self.kinds = np.array([item["kind"] for item in self.items])
+
+        logger.info(f"Matching catalog loaded: {len(self.items)} items, {len(self.skill_index)} skills")
+
+    @staticmethod
+    def _vocabulary(terms: Iterable[str]) -> Dict[str, int]:
+        index: Dict[str, int] = {}
+        for term in terms:
+            index.setdefault(term, len(index))
+        return index
+
+    @staticmethod
+    def _one_hot(rows: List[List[str]], index: Dict[str, int], transform=lambda term: term) -> np.ndarray:
+        matrix = np.zeros((len(rows), len(index)), dtype=np.float32)
+        for row, terms in enumerate(rows):
+            for term in terms:
+                column = index.get(transform(term))
+                if column is not None:
+                    matrix[row, column] = 1.0
+        return matrix
+
+    def _profile_vector(self, terms: Iterable[str], index: Dict[str, int], weights: Optional[np.ndarray] = None) -> np.ndarray:
+        vector = np.zeros(len(index), dtype=np.float32)
+        for term in terms:
+            column = index.get(term)
+            if column is not None:
+                vector[column] = 1.0
+        if weights is not None:
+            vector *= weights
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def recommend(self, profile: Dict[str, Any], kind: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Score every catalog item against a profile and return the top ``limit``"""
+        profile_skills = {normalize(s) for s in profile.get("skills") or []}
+        skill_vector = self._profile_vector(profile_skills, self.skill_index, self.idf)
+        industry_vector = self._profile_vector(
+            (normalize(i) for i in profile.get("industry_interests") or []), self.industry_index
+        )
+        goal_vector = self._profile_vector(
+            (k for goal in profile.get("career_goals") or [] for k in keywords(goal)), self.keyword_index
+        )
+
+        scores = (
+            SKILL_WEIGHT * (self.skills @ skill_vector)
+            + INDUSTRY_WEIGHT * (self.industries @ industry_vector)
+            + GOAL_WEIGHT * (self.keywords @ goal_vector)
+        )
+        level = profile.get("experience_level")
+        if level in LEVELS:
+            scores += EXPERIENCE_WEIGHT * self.levels[:, LEVELS.index(level)]
+        if kind:
+            scores = np.where(self.kinds == kind, scores, -np.inf)
+
+        candidates = int(np.isfinite(scores).sum())
+        limit = min(limit, candidates)
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+
+        return [self._result(self.items[i], float(scores[i]), profile_skills) for i in top]
+
+    @staticmethod
+    def _result(item: Dict[str, Any], score: float, profile_skills: set) -> Dict[str, Any]:
+        return {
+            "id": item["id"],
+            "kind": item["kind"],
+            "title": item["title"],
+            "score": round(score, 4),
+            "matched_skills": [s for s in item["skills"] if normalize(s) in profile_skills],
+            "missing_skills": [s for s in item["skills"] if normalize(s) not in profile_skills],
+        }
+
+# Global matching service instance
+matching_service = MatchingService()
@@ -0,0 +1,193 @@
+"""Live notifications pushed to connected clients.
+
+Producers publish to the Redis channel ``notifications:{user_id}``. Each
+worker process holds a single pattern subscription to ``notifications:*``
+and fans every message out in memory to that user's connected clients,
+so Redis connections scale with workers rather than with open tabs.
+
+Every client has a bounded queue. A client that falls
+``notification_queue_size`` messages behind is disconnected with a
+``dropped`` event instead of slowing delivery to everyone else; it is
+expected to reconnect and refetch state. Without Redis, notifications are
+delivered to clients of the publishing worker only.
+
+The same connection carries internal change signals on ``signals:{topic}``.
+They have no payload and only wake local watchers of the topic, which then
+reread the shared state themselves (e.g. batch job progress).
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Set
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.services.cache_service import cache_service
+from app.utils.metrics import metrics
+from app.utils.profiling import profile_span
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "notifications:"
+SIGNAL_PREFIX = "signals:"
+DROPPED = object()
+
+notification_subscribers = metrics.gauge("notification_subscribers", "Clients connected to the notification stream")
+notifications_delivered_total = metrics.counter("notifications_delivered_total", "Notifications queued to connected clients")
+notification_clients_dropped_total = metrics.counter("notification_clients_dropped_total", "Clients disconnected for falling behind")
+
+class TooManySubscribersError(Exception):
+    """This worker already serves the maximum number of notification clients"""
+
+class Subscriber:
+    __slots__ = ("user_id", "queue")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.notification_queue_size)
+
+class NotificationService:
+    def __init__(self):
+        self.redis_client = cache_service.redis_client
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.count = 0
+        self.watchers: Dict[str, Set[asyncio.Event]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        notification_subscribers.set_function(lambda: self.count)
+
+    async def start(self):
+        """Open this worker's pub/sub connection"""
+        if not self.redis_client or self._listener:
+            return
+        self._listener = asyncio.create_task(self._listen(), name="notification-listener")
+        logger.info("Notification listener started")
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def publish(self, user_id: str, type: str, data: Optional[Dict[str, Any]] = None):
+        """Send a notification to every client of a user, on any worker"""
+        if not settings.notifications_enabled:
+            return
+        payload = json.dumps({"type": type, "data": data or {}}, default=str)
+
+        if not self.redis_client:
+            self.dispatch(user_id, payload)
+            return
+        try:
+            with profile_span("redis.publish"):
+                self.redis_client.publish(f"{CHANNEL_PREFIX}{user_id}", payload)
+        except Exception as e:
+            logger.error(f"Error publishing notification: {str(e)}")
+
+    async def signal(self, topic: str):
+        """Wake every watcher of a topic, on any worker"""
+        if not self.redis_client:
+            self._wake(topic)
+            return
+        try:
+            with profile_span("redis.publish"):
+                self.redis_client.publish(f"{SIGNAL_PREFIX}{topic}", "")
+        except Exception as e:
+            logger.error(f"Error publishing signal: {str(e)}")
+
+    def watch(self, topic: str) -> asyncio.Event:
+        """Event set whenever the topic is signalled; the caller clears it"""
+        event = asyncio.Event()
+        self.watchers.setdefault(topic, set()).add(event)
+        return event
+
+    def unwatch(self, topic: str, event: asyncio.Event):
+        events = self.watchers.get(topic)
+        if events is not None:
+            events.discard(event)
+            if not events:
+                del self.watchers[topic]
+
+    def _wake(self, topic: str):
+        for event in self.watchers.get(topic, ()):
+            event.set()
+
+    def subscribe(self, user_id: str) -> Subscriber:
+        if self.count >= settings.notification_max_subscribers:
+            raise TooManySubscribersError("Too many notification clients on this server")
+        subscriber = Subscriber(user_id)
+        self.subscribers.setdefault(user_id, set()).add(subscriber)
+        self.count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        clients = self.subscribers.get(subscriber.user_id)
+        if not clients or subscriber not in clients:
+            return
+        clients.discard(subscriber)
+        if not clients:
+            del self.subscribers[subscriber.user_id]
+        self.count -= 1
+
+    def dispatch(self, user_id: str, payload: str):
+        """Queue one notification to this worker's clients of a user"""
+        clients = self.subscribers.get(user_id)
+        if not clients:
+            return
+
+        # Encoded once and shared by every client of the user
+        frame = f"data: {payload}\n\n"
+        for subscriber in list(clients):
+            try:
+                subscriber.queue.put_nowait(frame)
+                notifications_delivered_total.inc()
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber):
+        self.unsubscribe(subscriber)
+        notification_clients_dropped_total.inc()
+        # Discard its backlog so the stream ends promptly
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(DROPPED)
+
+    async def _listen(self):
+        while True:
+            client = aioredis.from_url(settings.redis_url, decode_responses=True)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*", f"{SIGNAL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if channel.startswith(SIGNAL_PREFIX):
+                        self._wake(channel[len(SIGNAL_PREFIX):])
+                    else:
+                        self.dispatch(channel[len(CHANNEL_PREFIX):], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Notification listener disconnected: {str(e)}. Reconnecting.")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+    async def stream(self, subscriber: Subscriber):
+        """Server-sent events for one client, with keepalive comments; unsubscribe it afterwards"""
+        yield ": connected\n\n"
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), settings.notification_keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if frame is DROPPED:
+                yield f"event: dropped\ndata: {json.dumps({'reason': 'slow_consumer'})}\n\n"
+                return
+            yield frame
+
+# Global notification service instance
+notification_service = NotificationService()
@@ -0,0 +1,159 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+# GCRA over two buckets (requests and tokens) in a single atomic call. Each
+# bucket stores only its theoretical arrival time (TAT); the request is let
+# through and both TATs advanced only if both buckets admit it.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local allowed = 1
+local retry = 0
+local tats = {}
+local out = {}
+
+for i = 1, 2 do
+    local limit = tonumber(ARGV[1 + i * 2])
+    local cost = tonumber(ARGV[2 + i * 2])
+    if limit > 0 then
+        local interval = period / limit
+        local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+        if tat < now then tat = now end
+        local new_tat = tat + cost * interval
+        local allow_at = new_tat - period
+        if now < allow_at then
+            allowed = 0
+            if allow_at - now > retry then retry = allow_at - now end
+            new_tat = tat
+        end
+        tats[i] = new_tat
+        out[i * 2 - 1] = math.max(0, math.floor((now - (new_tat - period)) / interval))
+        out[i * 2] = math.ceil(new_tat - now)
+    else
+        out[i * 2 - 1] = -1
+        out[i * 2] = 0
+    end
+end
+
+if allowed == 1 then
+    for i = 1, 2 do
+        if tats[i] ~= nil and tats[i] > now then
+            redis.call('SET', KEYS[i], tats[i], 'PX', math.ceil(tats[i] - now))
+        end
+    end
+end
+
+return {allowed, math.ceil(retry), out[1], out[2], out[3], out[4]}
+"""
+
+@dataclass
+class RateLimitTier:
+    requests: int
+    tokens: int = 0
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int
+    retry_after: int = 0
+    token_limit: int = 0
+    token_remaining: int = -1
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Standard RateLimit-* headers for this result"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+            "RateLimit-Policy": f"{self.limit};w={settings.rate_limit_window}",
+        }
+        if self.token_limit > 0:
+            headers["RateLimit-Policy"] += f", {self.token_limit};w={settings.rate_limit_window};comment=\"tokens\""
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+class RateLimitService:
+    """Per-key request and token limits backed by Redis, with an in-process fallback"""
+
+    def __init__(self):
+        self.tiers: Dict[str, RateLimitTier] = {
+            "simple": RateLimitTier(settings.rate_limit_simple_requests, settings.rate_limit_simple_tokens),
+            "chat": RateLimitTier(settings.rate_limit_chat_requests, settings.rate_limit_chat_tokens),
+            "batch": RateLimitTier(settings.rate_limit_batch_requests, settings.rate_limit_batch_tokens),
+            "read": RateLimitTier(settings.rate_limit_read_requests),
+            "write": RateLimitTier(settings.rate_limit_write_requests),
+            "tts": RateLimitTier(settings.rate_limit_tts_requests),
+        }
+        self.redis_client = cache_service.redis_client
+        self._script = self.redis_client.register_script(GCRA_SCRIPT) if self.redis_client else None
+        self._local_tats: Dict[str, float] = {}
+
+    async def check(self, key: str, tier: str, tokens: int = 0) -> RateLimitResult:
+        """Consume one request and ``tokens`` estimated tokens for ``key`` in ``tier``"""
+        limits = self.tiers[tier]
+        period_ms = settings.rate_limit_window * 1000
+        now_ms = int(time.time() * 1000)
+        request_key = f"ratelimit:{tier}:req:{key}"
+        token_key = f"ratelimit:{tier}:tok:{key}"
+        args = (now_ms, period_ms, limits.requests, 1, limits.tokens, tokens)
+
+        raw: Optional[Tuple] = None
+        if self._script:
+            try:
+                raw = self._script(keys=[request_key, token_key], args=list(args))
+            except Exception as e:
+                logger.error(f"Rate limit check failed, using in-process limiter: {str(e)}")
+        if raw is None:
+            raw = self._check_local([request_key, token_key], *args)
+
+        allowed, retry_ms, req_remaining, req_reset_ms, tok_remaining, _ = (int(v) for v in raw)
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limits.requests,
+            remaining=req_remaining,
+            reset=math.ceil(req_reset_ms / 1000),
+            retry_after=max(1, math.ceil(retry_ms / 1000)),
+            token_limit=limits.tokens,
+            token_remaining=tok_remaining
+        )
+
+    def _check_local(self, keys, now, period, req_limit, req_cost, tok_limit, tok_cost) -> Tuple:
+        """Same algorithm as GCRA_SCRIPT, against a per-process dict"""
+        if len(self._local_tats) > 100_000:
+            self._local_tats = {k: v for k, v in self._local_tats.items() if v > now}
+
+        allowed, retry = 1, 0.0
+        tats: Dict[str, float] = {}
+        out = []
+        for key, limit, cost in ((keys[0], req_limit, req_cost), (keys[1], tok_limit, tok_cost)):
+            if limit <= 0:
+                out += [-1, 0]
+                continue
+            interval = period / limit
+            tat = max(self._local_tats.get(key, now), now)
+            new_tat = tat + cost * interval
+            allow_at = new_tat - period
+            if now < allow_at:
+                allowed = 0
+                retry = max(retry, allow_at - now)
+                new_tat = tat
+            tats[key] = new_tat
+            out += [max(0, math.floor((now - (new_tat - period)) / interval)), math.ceil(new_tat - now)]
+
+        if allowed:
+            self._local_tats.update(tats)
+        return (allowed, math.ceil(retry), *out)
+
+# Global rate limit service instance
+rate_limit_service = RateLimitService()
@@ -0,0 +1,75 @@
+"""Rolling summaries of long conversations.
+
+Once the messages after a conversation's summary pass
+``history_window + 2 * summary_every_turns``, all but the last
+``history_window`` of them (rounded down to whole user/assistant pairs)
+are folded into the summary by ``summary_model``. Each summary is built from the previous one plus the
+new turns, never from the whole conversation. Prompts then carry the
+summary and a bounded tail of recent messages, so their size stays flat
+as a conversation grows.
+
+The summary is stored on the conversation row, and the cached history is
+dropped so the next request rebuilds it from the row (updating the cached
+copy in place could overwrite turns added meanwhile):
+
+    alter table conversations
+        add column summary text,
+        add column summary_message_count integer not null default 0;
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.models.history import ConversationHistory
+from app.services.ai_service import ai_service
+from app.services.cache_service import cache_service
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+class SummaryService:
+    def __init__(self):
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def maybe_schedule(self, conversation_id: str, history: ConversationHistory):
+        """Start a background summary update if enough turns have built up"""
+        if not settings.summary_enabled or conversation_id in self._running:
+            return
+
+        fold = len(history) - ai_service.history_window
+        fold -= fold % 2
+        if fold < 2 * settings.summary_every_turns:
+            return
+
+        task = asyncio.create_task(
+            self._summarize(conversation_id, history.summary, history.summarized, list(history.view(0, fold)))
+        )
+        self._running[conversation_id] = task
+        task.add_done_callback(lambda _: self._running.pop(conversation_id, None))
+
+    async def _summarize(
+        self,
+        conversation_id: str,
+        previous_summary: Optional[str],
+        summarized: int,
+        messages: List[Tuple[str, str]]
+    ):
+        try:
+            summary = await ai_service.summarize(previous_summary, messages)
+            covered = summarized + len(messages)
+            await db_service.update_conversation_summary(conversation_id, summary, covered)
+
+            await cache_service.invalidate_conversation_history(conversation_id)
+
+            logger.info(f"Summarized conversation {conversation_id} through message {covered}")
+        except Exception as e:
+            logger.error(f"Error summarizing conversation {conversation_id}: {str(e)}")
+
+    async def stop(self):
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+# Global summary service instance
+summary_service = SummaryService()
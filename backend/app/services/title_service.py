@@ -0,0 +1,109 @@
+"""Background titling of new conversations.
+
+Conversations are created as "New Conversation". After their first
+exchange they are queued here, off the request path. A single worker
+collects up to ``titling_batch_size`` of them, waiting at most
+``titling_max_delay`` seconds after the first, and titles the whole batch
+with one JSON-mode call to ``titling_model``. Titles are written back
+together and patched into each owner's cached conversation list.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.services.ai_service import ai_service
+from app.services.cache_service import cache_service
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TITLE = "New Conversation"
+
+@dataclass
+class TitleRequest:
+    conversation_id: str
+    user_id: str
+    message: str
+    response: str
+
+class TitleService:
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the titling worker"""
+        if not settings.titling_enabled or self._worker:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.titling_queue_size)
+        self._worker = asyncio.create_task(self._run(), name="title-worker")
+        logger.info("Conversation titling worker started")
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def enqueue(self, conversation: Dict, message: str, response: str):
+        """Queue a conversation for titling if it still has the default title"""
+        if not self._queue or conversation.get("title") not in (None, DEFAULT_TITLE):
+            return
+        try:
+            self._queue.put_nowait(TitleRequest(conversation["id"], conversation["user_id"], message, response))
+        except asyncio.QueueFull:
+            logger.warning(f"Titling queue full, leaving conversation {conversation['id']} untitled")
+
+    async def _next_batch(self) -> List[TitleRequest]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + settings.titling_max_delay
+        while len(batch) < settings.titling_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._title_batch(batch)
+            except Exception as e:
+                logger.error(f"Error titling {len(batch)} conversations: {str(e)}")
+
+    async def _title_batch(self, batch: List[TitleRequest]):
+        titles = await ai_service.generate_titles([(item.message, item.response) for item in batch])
+        generated = {item.conversation_id: title for item, title in zip(batch, titles) if title}
+        if not generated:
+            return
+
+        updated = await db_service.update_conversation_titles(generated, DEFAULT_TITLE)
+
+        by_user: Dict[str, Dict[str, str]] = {}
+        for item in batch:
+            if item.conversation_id in updated:
+                by_user.setdefault(item.user_id, {})[item.conversation_id] = generated[item.conversation_id]
+        for user_id, user_titles in by_user.items():
+            await self._patch_cached_list(user_id, user_titles)
+
+        logger.info(f"Titled {len(updated)} of {len(batch)} conversations")
+
+    @staticmethod
+    async def _patch_cached_list(user_id: str, titles: Dict[str, str]):
+        conversations = await cache_service.get_user_conversations(user_id)
+        if conversations is None:
+            return
+        for conversation in conversations:
+            if conversation["id"] in titles:
+                conversation["title"] = titles[conversation["id"]]
+        await cache_service.set_user_conversations(user_id, conversations)
+
+# Global title service instance
+title_service = TitleService()
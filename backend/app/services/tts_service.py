@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from app.config import settings
+from app.utils.profiling import profile_span
+
+logger = logging.getLogger(__name__)
+
+class AudioCache:
+    """Content-addressed audio files on local disk with size-bounded LRU eviction"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        # key -> file size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._load()
+
+    @staticmethod
+    def key(text: str, voice_id: str, model_id: str) -> str:
+        return hashlib.sha256(f"{model_id}\0{voice_id}\0{text}".encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.mp3")
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of a cached file, marking it as recently used"""
+        path = self.path(key)
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)
+            return None
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            # Written by another worker sharing the directory; adopt it
+            self._entries[key] = size
+            self.total_bytes += size
+            self._evict()
+        try:
+            # mtime carries the LRU order across restarts
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def temp_path(self, key: str) -> str:
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        return f"{self.path(key)}.{uuid.uuid4().hex}.part"
+
+    def publish(self, key: str, temp_path: str) -> int:
+        """Atomically move a fully written temp file under its key; blocking, returns its size"""
+        path = self.path(key)
+        os.replace(temp_path, path)
+        return os.path.getsize(path)
+
+    def add(self, key: str, size: int):
+        """Index a published file"""
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)
+        self._entries[key] = size
+        self.total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def _load(self):
+        """Rebuild the index from files left by previous runs"""
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".part"):
+                    os.remove(path)
+                elif name.endswith(".mp3"):
+                    stat = os.stat(path)
+                    found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+
+class TTSService:
+    """Streams ElevenLabs speech synthesis and caches the finished audio"""
+
+    def __init__(self):
+        self.voice_id = settings.elevenlabs_voice_id
+        self.model_id = settings.elevenlabs_model
+        self.cache = AudioCache(settings.tts_cache_dir, settings.tts_cache_max_bytes)
+        self.client = httpx.AsyncClient(
+            base_url=settings.elevenlabs_base_url,
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.elevenlabs_api_key)
+
+    def cache_key(self, text: str, voice_id: Optional[str] = None, model_id: Optional[str] = None) -> str:
+        return self.cache.key(text, voice_id or self.voice_id, model_id or self.model_id)
+
+    async def open_stream(self, text: str, voice_id: Optional[str] = None, model_id: Optional[str] = None) -> httpx.Response:
+        """Start an upstream synthesis, raising if it is rejected"""
+        request = self.client.build_request(
+            "POST",
+            f"/v1/text-to-speech/{voice_id or self.voice_id}/stream",
+            headers={"xi-api-key": settings.elevenlabs_api_key, "accept": "audio/mpeg"},
+            json={"text": text, "model_id": model_id or self.model_id}
+        )
+        with profile_span("elevenlabs.tts.stream_start"):
+            response = await self.client.send(request, stream=True)
+        if response.status_code != 200:
+            body = await response.aread()
+            await response.aclose()
+            raise httpx.HTTPStatusError(
+                f"TTS upstream returned {response.status_code}: {body[:200]!r}",
+                request=request,
+                response=response
+            )
+        return response
+
+    async def relay(self, key: str, response: httpx.Response) -> AsyncIterator[bytes]:
+        """Yield audio chunks as they arrive, caching them once the stream completes"""
+        # Disk writes run in threads so a slow disk never stalls the event loop
+        temp_path = await asyncio.to_thread(self.cache.temp_path, key)
+        completed = False
+        try:
+            f = await asyncio.to_thread(open, temp_path, "wb")
+            try:
+                async for chunk in response.aiter_bytes():
+                    await asyncio.to_thread(f.write, chunk)
+                    yield chunk
+            finally:
+                await asyncio.to_thread(f.close)
+            completed = True
+        finally:
+            await response.aclose()
+            if completed:
+                size = await asyncio.to_thread(self.cache.publish, key, temp_path)
+                self.cache.add(key, size)
+            else:
+                try:
+                    await asyncio.to_thread(os.remove, temp_path)
+                except OSError:
+                    pass
+                logger.warning(f"TTS stream for {key} did not complete; not caching")
+
+    async def close(self):
+        await self.client.aclose()
+
+# Global TTS service instance
+tts_service = TTSService()
@@ -0,0 +1,139 @@
+"""Admission control for LLM-bound requests.
+
+Each worker admits at most ``admission_max_inflight`` LLM-bound requests
+at a time, including the time spent streaming their response. Up to
+``admission_max_queue`` more may wait ``admission_queue_timeout`` seconds
+for a slot. A request is shed early with 503 and ``Retry-After`` when the
+queue is full, when its wait times out, or when event loop lag is above
+``admission_max_loop_lag_ms``.
+
+Admission is a dependency listed after authentication and rate limiting,
+so unauthenticated or rate-limited requests never hold a slot. An
+admitted request hands its slot back while it only waits, e.g. on another
+request holding its Idempotency-Key (``AdmissionSlot.released``).
+
+``/chat/simple`` is degraded instead of shed: it is let through with
+``request.state.degraded`` set, and the endpoint answers only from cache.
+Other routes (profile reads, health, metrics) are never gated.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+from app.utils.loop_monitor import loop_monitor
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+admission_inflight = metrics.gauge("admission_inflight", "LLM-bound requests currently admitted")
+admission_queued = metrics.gauge("admission_queued", "LLM-bound requests waiting for admission")
+admission_shed_total = metrics.counter("admission_shed_total", "LLM-bound requests rejected with 503")
+admission_degraded_total = metrics.counter("admission_degraded_total", "Requests served in cache-only degraded mode")
+
+class AdmissionController:
+    def __init__(self):
+        self.max_inflight = settings.admission_max_inflight
+        self.inflight = 0
+        self.queued = 0
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        admission_inflight.set_function(lambda: self.inflight)
+        admission_queued.set_function(lambda: self.queued)
+
+    def overload_reason(self) -> str:
+        """Why a new request cannot be admitted right now, or '' if it can"""
+        if loop_monitor.lag * 1000 > settings.admission_max_loop_lag_ms:
+            return "loop_lag"
+        if self.inflight >= self.max_inflight and self.queued >= settings.admission_max_queue:
+            return "queue_full"
+        return ""
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue up to the timeout"""
+        if not self._slots.locked():
+            await self._slots.acquire()
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), settings.admission_queue_timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.queued -= 1
+        self.inflight += 1
+        return True
+
+    async def reacquire(self):
+        """Take a slot back for an already admitted request, without shedding it"""
+        await self._slots.acquire()
+        self.inflight += 1
+
+    def release(self):
+        self.inflight -= 1
+        self._slots.release()
+
+class AdmissionSlot:
+    """The slot held by an admitted request, if any"""
+
+    def __init__(self, controller: Optional[AdmissionController] = None):
+        self.controller = controller
+
+    @asynccontextmanager
+    async def released(self) -> AsyncIterator[None]:
+        """Give the slot to other requests for the duration of a wait"""
+        controller = self.controller
+        if controller is None:
+            yield
+            return
+        self.controller = None
+        controller.release()
+        try:
+            yield
+        finally:
+            await controller.reacquire()
+            self.controller = controller
+
+    def close(self):
+        if self.controller is not None:
+            self.controller.release()
+            self.controller = None
+
+def admission(degradable: bool = False):
+    """Dependency admitting an LLM-bound request, shedding it with 503 under overload"""
+    async def admit(request: Request) -> AsyncIterator[AdmissionSlot]:
+        if not settings.admission_enabled:
+            yield AdmissionSlot()
+            return
+
+        reason = admission_controller.overload_reason()
+        if not reason and not await admission_controller.acquire():
+            reason = "queue_timeout"
+
+        if reason:
+            if degradable:
+                admission_degraded_total.inc(reason=reason)
+                request.state.degraded = True
+                yield AdmissionSlot()
+                return
+            admission_shed_total.inc(reason=reason)
+            logger.warning(f"Shedding {request.method} {request.url.path}: {reason}")
+            raise HTTPException(
+                status_code=503,
+                detail="Server is overloaded, please retry shortly",
+                headers={"Retry-After": str(settings.admission_retry_after)}
+            )
+
+        # Teardown runs after the response is sent, so streaming holds the slot too
+        slot = AdmissionSlot(admission_controller)
+        try:
+            yield slot
+        finally:
+            slot.close()
+
+    return admit
+
+# Global admission controller instance
+admission_controller = AdmissionController()
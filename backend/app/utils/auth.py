@@ -1,8 +1,11 @@
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Header, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from supabase import create_client
 from app.config import settings
+from app.utils.profiling import profile_span
+from typing import Optional
+import hmac
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,7 +19,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         token = credentials.credentials
         
         # Verify token with Supabase
-        user = supabase.auth.get_user(token)
+        with profile_span("supabase.auth.get_user"):
+            user = supabase.auth.get_user(token)
         
         if not user or not user.user:
             raise HTTPException(
@@ -47,4 +51,18 @@ async def get_optional_user(credentials: HTTPAuthorizationCredentials = Depends(
             
         return await get_current_user(credentials)
     except:
-        return None
\ No newline at end of file
+        return None
+
+def verify_admin_secret(value: Optional[str]) -> bool:
+    """Constant-time comparison against the configured admin secret"""
+    if not settings.admin_secret or not value:
+        return False
+    return hmac.compare_digest(value.encode(), settings.admin_secret.encode())
+
+async def require_admin(x_admin_secret: Optional[str] = Header(None)):
+    """Require the admin secret in the X-Admin-Secret header"""
+    if not verify_admin_secret(x_admin_secret):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""Event loop lag monitor and blocking-call detector.
+
+A heartbeat task on the event loop records how late each of its wake-ups
+is (the loop lag). A watchdog thread notices when the heartbeat stops for
+longer than ``loop_blocking_threshold_ms``. That means some callback is
+holding the loop, so the watchdog captures the loop thread's stack while
+the callback is still running and logs it, at most once per
+``loop_monitor_log_interval`` for each call site.
+
+In strict mode (``loop_monitor_strict``, meant for tests and benchmarks),
+``BlockingCallMiddleware`` fails requests that blocked the loop
+themselves. Each stall is attributed to the task the watchdog caught
+running, and through a context variable to the request that created that
+task, so a request is not blamed for stalls caused by others. A request is
+failed only if the stall happened before its response started; later
+stalls are logged. Long-lived streams are not tracked.
+``assert_no_blocking_calls`` checks all stalls for other code.
+"""
+import asyncio
+import logging
+import re
+import sys
+import threading
+import time
+import traceback
+import weakref
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+loop_lag_seconds = metrics.gauge("event_loop_lag_seconds", "Delay of the latest event loop heartbeat")
+loop_lag_max_seconds = metrics.gauge("event_loop_lag_max_seconds", "Largest event loop heartbeat delay since start")
+blocking_calls_total = metrics.counter("event_loop_blocking_calls_total", "Callbacks that held the event loop past the threshold")
+
+# Long-lived streams, whose lifetime says nothing about the request itself
+STREAMING_ROUTES = re.compile(
+    r"^/api/v1/(chat/conversation/[^/]+/stream|batch/jobs/[^/]+/events|notifications/stream)$"
+)
+
+# Blocking calls of the request the current task is running for
+_request_calls: ContextVar[Optional[List["BlockingCall"]]] = ContextVar("request_blocking_calls", default=None)
+
+class BlockingCallError(RuntimeError):
+    """A callback blocked the event loop while strict mode was on"""
+
+class BlockingCall:
+    def __init__(self, duration: float, stack: str):
+        self.duration = duration
+        self.stack = stack
+        self.detected_at = time.time()
+
+class LoopMonitor:
+    def __init__(self):
+        self.interval = settings.loop_monitor_interval
+        self.threshold = settings.loop_blocking_threshold_ms / 1000
+        self.strict = settings.loop_monitor_strict
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.violations: List[BlockingCall] = []
+        self._current_call: Optional[BlockingCall] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._beat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._last_logged: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        # Task -> blocking calls of the request it was created for (strict mode)
+        self._task_calls: "weakref.WeakKeyDictionary[asyncio.Task, List[BlockingCall]]" = weakref.WeakKeyDictionary()
+
+    async def start(self):
+        """Start the heartbeat on the running loop and the watchdog thread"""
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop_event.clear()
+        if self.strict:
+            self._loop.set_task_factory(self._task_factory)
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join()
+            self._watchdog = None
+        if self._loop and self._loop.get_task_factory() == self._task_factory:
+            self._loop.set_task_factory(None)
+
+    def _task_factory(self, loop, coro, **kwargs):
+        """Create tasks as usual, remembering which request each belongs to"""
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        calls = _request_calls.get()
+        if calls is not None:
+            self._task_calls[task] = calls
+        return task
+
+    def track_request(self) -> List[BlockingCall]:
+        """Collect blocking calls of the current task and the tasks it creates"""
+        calls: List[BlockingCall] = []
+        _request_calls.set(calls)
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_calls[task] = calls
+        return calls
+
+    async def _heartbeat(self):
+        while True:
+            expected = self._loop.time() + self.interval
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, self._loop.time() - expected)
+            if self._current_call:
+                # The stall was reported while ongoing; now its full length is known
+                self._current_call.duration = max(self._current_call.duration, self.lag)
+                self._current_call = None
+            self.max_lag = max(self.max_lag, self.lag)
+            loop_lag_seconds.set(self.lag)
+            loop_lag_max_seconds.set(self.max_lag)
+
+    def _watch(self):
+        reported_beat = None
+        check_every = max(self.threshold / 2, 0.005)
+        while not self._stop_event.wait(check_every):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or beat == reported_beat:
+                continue
+            # Report each stall once, with the stack of whatever is holding the loop
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            self._current_call = BlockingCall(stalled, stack)
+            self._record(self._current_call, frame)
+            if self.strict:
+                self._attribute(self._current_call)
+
+    def _attribute(self, call: BlockingCall):
+        """Charge a stall to the request whose task is holding the loop"""
+        try:
+            # The loop thread is stuck in this task, so its state is stable
+            task = asyncio.current_task(self._loop)
+            calls = self._task_calls.get(task) if task is not None else None
+        except Exception:
+            return
+        if calls is not None:
+            calls.append(call)
+
+    def _record(self, call: BlockingCall, frame):
+        blocking_calls_total.inc()
+        if self.strict:
+            self.violations.append(call)
+
+        site = f"{frame.f_code.co_filename}:{frame.f_lineno}" if frame else "unknown"
+        now = time.monotonic()
+        if now - self._last_logged.get(site, 0.0) < settings.loop_monitor_log_interval:
+            self._suppressed[site] = self._suppressed.get(site, 0) + 1
+            return
+        suppressed = self._suppressed.pop(site, 0)
+        self._last_logged[site] = now
+        logger.warning(
+            f"Event loop blocked for at least {call.duration * 1000:.0f} ms at {site}"
+            f"{f' ({suppressed} similar reports suppressed)' if suppressed else ''}:\n{call.stack}"
+        )
+
+    def assert_no_blocking_calls(self, since: int = 0):
+        """Raise if blocking calls were recorded after the first ``since`` violations"""
+        new = self.violations[since:]
+        if new:
+            worst = max(new, key=lambda call: call.duration)
+            raise BlockingCallError(
+                f"{len(new)} blocking call(s) detected, worst {worst.duration * 1000:.0f} ms:\n{worst.stack}"
+            )
+
+class BlockingCallMiddleware:
+    """Strict-mode ASGI middleware failing requests that blocked the event loop"""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or STREAMING_ROUTES.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        calls = self.monitor.track_request()
+        started = False
+
+        async def checked_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                if calls:
+                    # Nothing has been sent yet, so the request can still fail
+                    raise BlockingCallError(self._describe(scope, calls))
+                started = True
+            await send(message)
+
+        await self.app(scope, receive, checked_send)
+        if calls and started:
+            logger.error(f"After its response started, {self._describe(scope, calls)}")
+
+    @staticmethod
+    def _describe(scope, calls: List[BlockingCall]) -> str:
+        worst = max(calls, key=lambda call: call.duration)
+        return (
+            f"{scope['method']} {scope['path']} blocked the event loop {len(calls)} time(s), "
+            f"worst {worst.duration * 1000:.0f} ms:\n{worst.stack}"
+        )
+
+# Global loop monitor instance
+loop_monitor = LoopMonitor()
@@ -0,0 +1,199 @@
+"""On-demand request profiling.
+
+A request is profiled when it carries an authorized ``X-Profile`` header or is
+picked by ``profiling_sample_rate``. While it runs, a background thread
+samples the event loop thread's stack every ``profiling_interval_ms``, and
+``profile_span`` records the wall time spent awaiting each external client.
+Both are written as folded stacks (flamegraph.pl / speedscope format, values
+in microseconds) to a bounded ring of files in ``profiling_dir``.
+
+The middleware is only installed when profiling is configured, and
+``profile_span`` returns a shared no-op object when no trace is active, so
+the cost with profiling off is a single context variable lookup.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["RequestTrace"]] = contextvars.ContextVar(
+    "profiling_trace", default=None
+)
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: "RequestTrace", name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.spans[self.name] += int((time.perf_counter() - self.start) * 1_000_000)
+        return False
+
+def profile_span(name: str):
+    """Time the enclosed block as a wait on ``name`` when the request is profiled"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name)
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class RequestTrace:
+    """Samples and external-wait spans collected for one request"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.spans: Counter = Counter()
+        self.started_at = datetime.utcnow()
+        self.interval = settings.profiling_interval_ms / 1000
+        self._sampler = _StackSampler(threading.get_ident(), self.interval)
+        self._start = time.perf_counter()
+        self.duration = 0.0
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._sampler.stop()
+        self.duration = time.perf_counter() - self._start
+
+    def folded(self) -> str:
+        """Render the trace as folded stacks weighted in microseconds"""
+        root = f"{self.method} {self.path}"
+        sample_us = int(self.interval * 1_000_000)
+        lines = [
+            f"{root};cpu;{stack} {count * sample_us}"
+            for stack, count in self._sampler.samples.most_common()
+        ]
+        lines += [f"{root};await;{name} {us}" for name, us in self.spans.most_common()]
+        return "\n".join(lines) + "\n"
+
+class TraceStore:
+    """Bounded ring of trace files on local disk"""
+
+    def __init__(self, directory: str, max_traces: int):
+        self.directory = directory
+        self.max_traces = max_traces
+
+    def save(self, trace: RequestTrace) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", trace.path).strip("-") or "root"
+        name = (
+            f"{trace.started_at.strftime('%Y%m%dT%H%M%S%f')}-{trace.method.lower()}-"
+            f"{slug[:60]}-{int(trace.duration * 1000)}ms.folded"
+        )
+        with open(os.path.join(self.directory, name), "w") as f:
+            f.write(trace.folded())
+
+        for old in self.list()[self.max_traces:]:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+        return name
+
+    def list(self) -> List[str]:
+        """Trace file names, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            (f for f in os.listdir(self.directory) if f.endswith(".folded")),
+            reverse=True
+        )
+
+    def path(self, name: str) -> Optional[str]:
+        if os.path.basename(name) != name or name not in self.list():
+            return None
+        return os.path.join(self.directory, name)
+
+trace_store = TraceStore(settings.profiling_dir, settings.profiling_max_traces)
+
+def profiling_enabled() -> bool:
+    return bool(settings.admin_secret) or settings.profiling_sample_rate > 0
+
+class ProfilingMiddleware:
+    """ASGI middleware that traces selected requests"""
+
+    def __init__(self, app, authorize: Callable[[str], bool]):
+        self.app = app
+        self.authorize = authorize
+        # Samplers observe the whole loop thread, so one trace at a time
+        self._active = False
+
+    def _should_profile(self, scope) -> bool:
+        for key, value in scope["headers"]:
+            if key == b"x-profile":
+                return self.authorize(value.decode("latin-1"))
+        return settings.profiling_sample_rate > 0 and random.random() < settings.profiling_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+        trace.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            trace.stop()
+            _current_trace.reset(token)
+            self._active = False
+            try:
+                name = await asyncio.to_thread(trace_store.save, trace)
+                logger.info(f"Saved profile trace {name}")
+            except Exception as e:
+                logger.error(f"Error saving profile trace: {str(e)}")
@@ -0,0 +1,95 @@
+from fastapi import HTTPException, Depends, Request, status
+from starlette.datastructures import MutableHeaders
+import json
+import logging
+
+from app.config import settings
+from app.services.ai_service import ai_service
+from app.services.rate_limit_service import rate_limit_service
+from app.utils.auth import get_current_user
+
+logger = logging.getLogger(__name__)
+
+def client_ip(request: Request) -> str:
+    """Client address, honouring X-Forwarded-For only when configured to"""
+    if settings.rate_limit_trust_forwarded:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+async def estimate_tokens(request: Request) -> int:
+    """Rough LLM token cost of a request: prompt size plus the completion budget"""
+    body = await request.body()
+    if not body:
+        return 0
+    
+    completions = 1
+    try:
+        payload = json.loads(body)
+        if isinstance(payload, dict) and isinstance(payload.get("prompts"), list):
+            completions = max(1, len(payload["prompts"]))
+    except ValueError:
+        pass
+    
+    return len(body) // 4 + completions * ai_service.max_tokens
+
+async def enforce_rate_limit(request: Request, tier: str, key: str):
+    """Consume from the tier's limits for key, raising 429 when exhausted"""
+    if not settings.rate_limit_enabled:
+        return
+    
+    tokens = await estimate_tokens(request) if rate_limit_service.tiers[tier].tokens else 0
+    result = await rate_limit_service.check(key, tier, tokens=tokens)
+    
+    if not result.allowed:
+        logger.info(f"Rate limit exceeded for {key} on tier {tier}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers=result.headers
+        )
+    
+    # Added by RateLimitHeadersMiddleware, so they also reach responses the
+    # endpoint builds itself (streams, exports, audio)
+    request.state.rate_limit_headers = result.headers
+
+class RateLimitHeadersMiddleware:
+    """Adds the RateLimit-* headers recorded during the request to its response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                rate_limit_headers = scope.get("state", {}).get("rate_limit_headers")
+                if rate_limit_headers:
+                    headers = MutableHeaders(scope=message)
+                    for name, value in rate_limit_headers.items():
+                        if name not in headers:
+                            headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+def rate_limit(tier: str):
+    """Dependency limiting the authenticated user on the given tier"""
+    async def check_user_rate_limit(
+        request: Request,
+        current_user: dict = Depends(get_current_user)
+    ):
+        await enforce_rate_limit(request, tier, f"user:{current_user['id']}")
+    
+    return check_user_rate_limit
+
+def ip_rate_limit(tier: str):
+    """Dependency limiting the client IP on the given tier"""
+    async def check_ip_rate_limit(request: Request):
+        await enforce_rate_limit(request, tier, f"ip:{client_ip(request)}")
+    
+    return check_ip_rate_limit
@@ -0,0 +1,172 @@
+"""Incrementally encoded, compressed list responses.
+
+Rows we produced ourselves are already valid, so they are projected onto
+the response model's fields and encoded with orjson directly instead of
+being validated into Pydantic models first. Output is a JSON array, or
+NDJSON when the client asks for ``application/x-ndjson``. Each page is
+encoded and compressed as it arrives from the database. Responses carry a
+weak ETag, and a matching ``If-None-Match`` gets a 304 before any rows are
+read.
+
+The first page is read before the status line is sent, so a failing query
+still gets a normal 5xx. Once the body has started, a failure re-raises
+and the server aborts the connection without the final chunk. The client
+then sees a truncated transfer rather than a short but complete body, and
+never caches a partial body under the ETag.
+"""
+import hashlib
+import inspect
+import logging
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Type
+
+import brotli
+import orjson
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(orjson.dumps(parts, default=str), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in request.headers.get("accept-encoding", "").split(",")
+    }
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON in request.headers.get("accept", "")
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+async def _encode(pages: AsyncIterator[List[Dict[str, Any]]], fields: Iterable[str], ndjson: bool) -> AsyncIterator[bytes]:
+    fields = tuple(fields)
+    first = True
+    if not ndjson:
+        yield b"["
+    async for page in pages:
+        if not page:
+            continue
+        encoded = [orjson.dumps({field: row.get(field) for field in fields}, default=str) for row in page]
+        if ndjson:
+            yield b"\n".join(encoded) + b"\n"
+        else:
+            yield (b"" if first else b",") + b",".join(encoded)
+        first = False
+    if not ndjson:
+        yield b"]"
+
+async def _compress(chunks: AsyncIterator[bytes], encoding: Optional[str]) -> AsyncIterator[bytes]:
+    if encoding is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=4)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        compress = compressor.compress
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    async for chunk in chunks:
+        # Flush per page so clients can start parsing before the last row
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+async def _abort_on_error(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception as e:
+        # Headers are gone; re-raising makes the server drop the connection
+        logger.error(f"Error streaming response body, aborting: {str(e)}")
+        raise
+
+async def _prepend(first: List[Dict[str, Any]], pages: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[List[Dict[str, Any]]]:
+    yield first
+    async for page in pages:
+        yield page
+
+def stream_with_cleanup(chunks: AsyncIterator[Any], cleanup: Callable, **kwargs) -> StreamingResponse:
+    """StreamingResponse that runs ``cleanup`` (sync or async) exactly once, however it ends.
+
+    Cleanup runs when the body ends or fails. A client that disconnects
+    before the first chunk never starts the body at all, so cleanup is also
+    the response's background task, which starlette runs in that case too.
+    """
+    done = False
+
+    async def run_cleanup():
+        nonlocal done
+        if not done:
+            done = True
+            result = cleanup()
+            if inspect.isawaitable(result):
+                await result
+
+    async def body():
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await run_cleanup()
+
+    return StreamingResponse(body(), background=BackgroundTask(run_cleanup), **kwargs)
+
+async def single_page(rows: List[Dict[str, Any]]) -> AsyncIterator[List[Dict[str, Any]]]:
+    yield rows
+
+async def stream_rows(
+    request: Request,
+    pages: AsyncIterator[List[Dict[str, Any]]],
+    model: Type[BaseModel],
+    version: Optional[Any] = None
+) -> Response:
+    """Stream rows as a (compressed) JSON array or NDJSON response.
+
+    ``version`` identifies the current state of the rows; when given it
+    becomes the response's ETag. Errors reading the first page propagate to
+    the caller.
+    """
+    ndjson = wants_ndjson(request)
+    encoding = negotiate_encoding(request)
+    headers = {
+        "Vary": "Accept, Accept-Encoding",
+        "Cache-Control": "private, no-cache",
+    }
+    if version is not None:
+        etag = make_etag(version, ndjson)
+        headers["ETag"] = etag
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    first = await anext(pages, [])
+
+    return StreamingResponse(
+        _abort_on_error(_compress(_encode(_prepend(first, pages), model.model_fields.keys(), ndjson), encoding)),
+        media_type=NDJSON if ndjson else "application/json",
+        headers=headers
+    )
@@ -0,0 +1,9 @@
+"""Gunicorn worker classes, importable by dotted path.
+
+gunicorn is POSIX-only, so this module is only imported by the production
+server, never by the app itself.
+"""
+from uvicorn.workers import UvicornWorker
+
+class TunedUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
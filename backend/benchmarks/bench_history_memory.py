@@ -0,0 +1,74 @@
+"""Memory benchmark for conversation history representations.
+
+Compares the list-of-dicts history the chat path used to build, copy and
+concatenate per turn against ConversationHistory, measured with tracemalloc:
+
+    python benchmarks/bench_history_memory.py --conversations 5000 --messages 40
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.history import ConversationHistory
+
+def make_rows(conversation: int, messages: int) -> list:
+    return [
+        {
+            "message_type": "assistant" if i % 2 else "user",
+            "content": f"conversation {conversation} message {i} " + "lorem ipsum " * 20,
+        }
+        for i in range(messages)
+    ]
+
+def dict_turn(rows: list) -> list:
+    """One turn of the old path: build, copy into the prompt, concatenate for the cache"""
+    history = [
+        {"role": "assistant" if row["message_type"] == "assistant" else "user", "content": row["content"]}
+        for row in rows
+    ]
+    prompt = [{"role": "system", "content": "system"}]
+    for message in history[-10:]:
+        prompt.append({"role": message["role"], "content": message["content"]})
+    prompt.append({"role": "user", "content": "question"})
+    return history + [{"role": "user", "content": "question"}, {"role": "assistant", "content": "answer"}]
+
+def compact_turn(rows: list) -> ConversationHistory:
+    """The same turn with ConversationHistory"""
+    history = ConversationHistory.from_rows(rows)
+    prompt = [{"role": "system", "content": "system"}]
+    prompt.extend(history.tail(10).messages())
+    prompt.append({"role": "user", "content": "question"})
+    history.append("user", "question")
+    history.append("assistant", "answer")
+    return history
+
+def measure(label: str, turn, all_rows: list):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    retained = [turn(rows) for rows in all_rows]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_conversation = (current - before) / len(retained)
+    print(f"{label:<22} retained {(current - before) / 2**20:8.1f} MiB  "
+          f"peak {(peak - before) / 2**20:8.1f} MiB  "
+          f"{per_conversation / 1024:6.1f} KiB/conversation")
+    return current - before
+
+def main(conversations: int, messages: int):
+    # Message contents are shared by both runs, so only the history overhead is measured
+    all_rows = [make_rows(c, messages) for c in range(conversations)]
+    print(f"conversations: {conversations}, messages each: {messages}")
+    dicts = measure("list of dicts", dict_turn, all_rows)
+    compact = measure("ConversationHistory", compact_turn, all_rows)
+    print(f"savings: {(1 - compact / dicts) * 100:.0f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=40)
+    args = parser.parse_args()
+    main(args.conversations, args.messages)
@@ -0,0 +1,129 @@
+"""Fan-out benchmark for the notification stream.
+
+Opens many SSE connections for one user against a single worker, publishes
+notifications straight to Redis and reports delivered messages per second:
+
+    WORKERS=1 ENVIRONMENT=production RATE_LIMIT_ENABLED=false python -m app.server &
+    python benchmarks/bench_notifications.py --token $JWT --user-id $USER_ID --connections 2000
+
+Every published message is delivered to every connection, so delivered
+messages = published x connections. Connections the server refused (any
+non-200 status) and clients it dropped for falling behind are counted
+separately.
+
+One worker, with the benchmark on the same single CPU (so it competes with
+the server for that core):
+
+    connections  messages  rate     delivered      refused  dropped
+    200          200       max      6690 msg/s     0        0
+    1000         200       50/s     4602 msg/s     0        0
+    2000         100       20/s     4215 msg/s     0        0
+    1000         200       max      -              0        1000
+    150          50        50/s     4190 msg/s     50 (503) 0
+
+At 1000 connections with no rate limit, the benchmark's own clients could
+not read fast enough. Every queue filled past
+``notification_queue_size`` and the server dropped them all as slow
+consumers, as designed. The last run used
+``NOTIFICATION_MAX_SUBSCRIBERS=100``.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import httpx
+import redis.asyncio as aioredis
+
+async def client(http: httpx.AsyncClient, url: str, headers: dict, ready: asyncio.Event, target: int,
+                 connected: list, received: list, refused: list, dropped: list, index: int):
+    def settled():
+        if len(connected) + len(refused) >= target:
+            ready.set()
+
+    try:
+        async with http.stream("GET", url, headers=headers) as response:
+            if response.status_code != 200:
+                refused.append(response.status_code)
+                settled()
+                return
+            async for line in response.aiter_lines():
+                if line == ": connected":
+                    connected.append(index)
+                    settled()
+                elif line.startswith("event: dropped"):
+                    dropped.append(index)
+                    return
+                elif line.startswith("data: "):
+                    received[index] += 1
+    except httpx.HTTPError as e:
+        if index not in connected:
+            refused.append(type(e).__name__)
+            settled()
+
+async def main(base_url: str, token: str, user_id: str, redis_url: str,
+               connections: int, messages: int, rate: float):
+    url = f"{base_url}/api/v1/notifications/stream"
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=0)
+    ready = asyncio.Event()
+    connected: list = []
+    refused: list = []
+    dropped: list = []
+    received = [0] * connections
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(None, connect=30.0)) as http:
+        start = time.perf_counter()
+        tasks = [
+            asyncio.create_task(client(http, url, headers, ready, connections, connected, received, refused, dropped, i))
+            for i in range(connections)
+        ]
+        try:
+            await asyncio.wait_for(ready.wait(), timeout=120)
+        except asyncio.TimeoutError:
+            pass
+        print(f"connections: {len(connected)}/{connections} in {time.perf_counter() - start:.1f}s")
+
+        publisher = aioredis.from_url(redis_url)
+        channel = f"notifications:{user_id}"
+        interval = 1 / rate if rate else 0
+        start = time.perf_counter()
+        for i in range(messages):
+            await publisher.publish(channel, json.dumps({"type": "bench", "data": {"seq": i}}))
+            if interval:
+                await asyncio.sleep(interval)
+        published = time.perf_counter() - start
+
+        # Wait until everything arrived or delivery stalls for a second
+        expected = messages * len(connected)
+        last, last_change = -1, time.perf_counter()
+        while sum(received) < expected and time.perf_counter() - last_change < 1:
+            if sum(received) != last:
+                last, last_change = sum(received), time.perf_counter()
+            await asyncio.sleep(0.05)
+        elapsed = (time.perf_counter() if sum(received) >= expected else last_change) - start
+        await publisher.aclose()
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    delivered = sum(received)
+    print(f"published:   {messages} in {published:.2f}s ({messages / published if published > 0 else 0:.0f} msg/s)")
+    print(f"delivered:   {delivered}/{expected} in {elapsed:.2f}s ({delivered / elapsed if elapsed > 0 else 0:.0f} msg/s)")
+    print(f"refused:     {len(refused)} connections {dict(Counter(refused)) if refused else ''}")
+    print(f"dropped:     {len(dropped)} slow clients")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=0, help="Messages per second to publish; 0 for as fast as possible")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.token, args.user_id, args.redis_url,
+                     args.connections, args.messages, args.rate))
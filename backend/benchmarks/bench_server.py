@@ -0,0 +1,56 @@
+"""Throughput benchmark for the production server.
+
+Start the server with different worker counts and compare requests/sec:
+
+    WORKERS=1 ENVIRONMENT=production python -m app.server &
+    python benchmarks/bench_server.py --url http://localhost:8000/health
+
+    WORKERS=4 ENVIRONMENT=production python -m app.server &
+    python benchmarks/bench_server.py --url http://localhost:8000/health
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+async def client_loop(client: httpx.AsyncClient, url: str, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(url)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+async def main(url: str, concurrency: int, duration: float):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: list = []
+    errors: list = []
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*[
+            client_loop(client, url, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+
+    latencies.sort()
+    print(f"url:         {url}")
+    print(f"concurrency: {concurrency}")
+    print(f"requests:    {len(latencies)} ({len(errors)} errors)")
+    print(f"throughput:  {len(latencies) / duration:.0f} req/s")
+    if latencies:
+        print(f"latency p50: {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"latency p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000/health")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.concurrency, args.duration))
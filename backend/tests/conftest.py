@@ -0,0 +1,9 @@
+"""Test settings: dummy credentials and no Redis, so services use their local fallbacks."""
+import os
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test.anon.key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test.service.key")
+os.environ.setdefault("GROQ_API_KEY", "test")
+# Nothing listens on port 1, so the cache service starts without Redis
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1"
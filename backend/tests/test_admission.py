@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+
+from app.config import settings
+from app.utils import admission as admission_module
+from app.utils.admission import AdmissionController, admission
+from app.utils.loop_monitor import loop_monitor
+
+@pytest.fixture
+def controller(monkeypatch):
+    """A fresh controller with one slot and one queue place"""
+    monkeypatch.setattr(settings, "admission_max_inflight", 1)
+    monkeypatch.setattr(settings, "admission_max_queue", 1)
+    monkeypatch.setattr(settings, "admission_queue_timeout", 0.05)
+    monkeypatch.setattr(loop_monitor, "lag", 0.0)
+    controller = AdmissionController()
+    monkeypatch.setattr(admission_module, "admission_controller", controller)
+    return controller
+
+def make_request() -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/api/v1/chat", "headers": []})
+
+async def admit(request: Request = None, degradable: bool = False):
+    """Enter the dependency; returns the generator to close and the slot.
+
+    Keep the generator referenced, or garbage collection closes it and
+    releases the slot, as FastAPI would when the request ends.
+    """
+    dependency = admission(degradable)(request or make_request())
+    return dependency, await dependency.__anext__()
+
+async def leave(dependency):
+    with pytest.raises(StopAsyncIteration):
+        await dependency.__anext__()
+
+def test_slot_is_released_after_the_request(controller):
+    async def run():
+        dependency, _ = await admit()
+        assert controller.inflight == 1
+        await leave(dependency)
+        return controller.inflight
+    assert asyncio.run(run()) == 0
+
+def test_full_queue_is_shed_with_retry_after(controller, monkeypatch):
+    monkeypatch.setattr(settings, "admission_max_queue", 0)
+
+    async def run():
+        first = await admit()
+        await admit()
+    with pytest.raises(HTTPException) as shed:
+        asyncio.run(run())
+    assert shed.value.status_code == 503
+    assert shed.value.headers["Retry-After"] == str(settings.admission_retry_after)
+
+def test_queued_request_is_shed_after_timeout(controller):
+    async def run():
+        first = await admit()
+        await admit()
+    with pytest.raises(HTTPException):
+        asyncio.run(run())
+    assert controller.queued == 0
+
+def test_queued_request_gets_the_freed_slot(controller):
+    async def run():
+        first, _ = await admit()
+        waiting = asyncio.create_task(admit())
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+        await leave(first)
+        second, _ = await waiting
+        return controller.inflight, controller.queued
+    assert asyncio.run(run()) == (1, 0)
+
+def test_loop_lag_sheds_before_taking_a_slot(controller, monkeypatch):
+    monkeypatch.setattr(loop_monitor, "lag", settings.admission_max_loop_lag_ms / 1000 + 1)
+    with pytest.raises(HTTPException):
+        asyncio.run(admit())
+    assert controller.inflight == 0
+
+def test_degradable_route_is_let_through_degraded(controller, monkeypatch):
+    monkeypatch.setattr(settings, "admission_max_queue", 0)
+    request = make_request()
+
+    async def run():
+        first = await admit()
+        _, slot = await admit(request, degradable=True)
+        return slot
+    slot = asyncio.run(run())
+    assert slot.controller is None
+    assert request.state.degraded is True
+
+def test_waiting_request_lends_its_slot(controller, monkeypatch):
+    monkeypatch.setattr(settings, "admission_max_queue", 0)
+
+    async def run():
+        _, slot = await admit()
+        async with slot.released():
+            other, _ = await admit()
+            await leave(other)
+        return controller.inflight
+    assert asyncio.run(run()) == 1
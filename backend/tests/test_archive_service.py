@@ -0,0 +1,126 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from app.services import archive_service as archive_module
+from app.services.archive_service import archive_service
+
+class FakeDatabase:
+    """In-memory conversations, chat_messages and conversation_archives"""
+
+    def __init__(self):
+        self.conversations: Dict[str, Dict[str, Any]] = {}
+        self.messages: List[Dict[str, Any]] = []
+        self.archives: Dict[str, Dict[str, Any]] = {}
+        # Called between reading the messages and flipping the status
+        self.before_flip = None
+
+    def add_conversation(self, conversation_id: str, count: int):
+        self.conversations[conversation_id] = {
+            "id": conversation_id, "user_id": "user", "status": "active",
+            "message_count": count, "updated_at": "2026-01-01T00:00:00+00:00",
+        }
+        for i in range(count):
+            self.add_message(conversation_id, i)
+
+    def add_message(self, conversation_id: str, i: int, touch: bool = False):
+        self.messages.append({
+            "id": f"{conversation_id}-{i}", "conversation_id": conversation_id,
+            "content": f"m{i}", "created_at": f"2026-01-01T00:00:{i:02d}+00:00",
+        })
+        if touch:
+            conversation = self.conversations[conversation_id]
+            conversation["message_count"] += 1
+            conversation["updated_at"] = f"2026-01-02T00:00:{i:02d}+00:00"
+
+    def rows(self, conversation_id: str) -> List[Dict[str, Any]]:
+        return [m for m in self.messages if m["conversation_id"] == conversation_id]
+
+    async def iter_conversation_messages(self, conversation_id: str, page_size: int = 500):
+        yield [dict(m) for m in self.rows(conversation_id)]
+
+    async def create_conversation_archive(self, archive: Dict[str, Any]):
+        self.archives[archive["conversation_id"]] = archive
+        return archive
+
+    async def get_conversation_archive(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        return self.archives.get(conversation_id)
+
+    async def delete_conversation_archive(self, conversation_id: str):
+        self.archives.pop(conversation_id, None)
+
+    async def set_conversation_status(self, conversation_id: str, status: str):
+        self.conversations[conversation_id]["status"] = status
+
+    async def set_conversation_status_if_unchanged(self, conversation: Dict[str, Any], status: str) -> bool:
+        if self.before_flip:
+            self.before_flip()
+        current = self.conversations[conversation["id"]]
+        if any(current[field] != conversation[field] for field in ("status", "message_count", "updated_at")):
+            return False
+        current["status"] = status
+        return True
+
+    async def count_conversation_messages(self, conversation_id: str) -> int:
+        return len(self.rows(conversation_id))
+
+    async def delete_conversation_messages(self, conversation_id: str, up_to: str):
+        self.messages = [
+            m for m in self.messages
+            if m["conversation_id"] != conversation_id or m["created_at"] > up_to
+        ]
+
+    async def restore_messages(self, messages: List[Dict[str, Any]]):
+        present = {m["id"] for m in self.messages}
+        self.messages.extend(m for m in messages if m["id"] not in present)
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(archive_module, "db_service", fake)
+    return fake
+
+def visible_messages(db: FakeDatabase, conversation_id: str) -> List[str]:
+    """Message contents as the API reads them for the conversation's status"""
+    if db.conversations[conversation_id]["status"] == "archived":
+        messages = asyncio.run(archive_service.get_archived_messages(conversation_id))
+    else:
+        messages = db.rows(conversation_id)
+    return [m["content"] for m in messages]
+
+def test_compress_round_trip():
+    messages = [{"id": "1", "content": "héllo", "created_at": "2026-01-01T00:00:00+00:00"}]
+    assert archive_service.decompress(archive_service.compress(messages)) == messages
+
+def test_read_after_archive(db):
+    db.add_conversation("c", 3)
+    assert asyncio.run(archive_service.archive_conversation(dict(db.conversations["c"])))
+    assert db.conversations["c"]["status"] == "archived"
+    assert db.rows("c") == []
+    assert visible_messages(db, "c") == ["m0", "m1", "m2"]
+
+def test_rehydrate_restores_messages(db):
+    db.add_conversation("c", 2)
+    asyncio.run(archive_service.archive_conversation(dict(db.conversations["c"])))
+    asyncio.run(archive_service.rehydrate("c"))
+    assert db.conversations["c"]["status"] == "active"
+    assert "c" not in db.archives
+    assert visible_messages(db, "c") == ["m0", "m1"]
+
+def test_conversation_written_while_archiving_stays_active(db):
+    db.add_conversation("c", 2)
+    picked = dict(db.conversations["c"])
+    db.before_flip = lambda: db.add_message("c", 2, touch=True)
+    assert not asyncio.run(archive_service.archive_conversation(picked))
+    assert db.conversations["c"]["status"] == "active"
+    assert "c" not in db.archives
+    assert visible_messages(db, "c") == ["m0", "m1", "m2"]
+
+def test_message_inserted_before_stats_update_is_not_hidden(db):
+    db.add_conversation("c", 2)
+    # The row exists but message_count and updated_at have not caught up yet
+    db.before_flip = lambda: db.add_message("c", 2)
+    assert not asyncio.run(archive_service.archive_conversation(dict(db.conversations["c"])))
+    assert db.conversations["c"]["status"] == "active"
+    assert visible_messages(db, "c") == ["m0", "m1", "m2"]
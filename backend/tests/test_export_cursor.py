@@ -0,0 +1,63 @@
+import asyncio
+import base64
+import uuid
+
+import orjson
+import pytest
+
+from app.config import settings
+from app.services import export_service as export_module
+from app.services.export_service import InvalidCursorError, decode_cursor, encode_cursor, export_service
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(value)).decode()
+
+def conversation(created_at: str) -> dict:
+    return {"id": str(uuid.uuid4()), "created_at": created_at, "status": "active"}
+
+def test_cursor_round_trip():
+    row = conversation("2024-05-01T12:00:00.123456+00:00")
+    assert decode_cursor(encode_cursor(row)) == (row["created_at"], row["id"])
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    raw_cursor({"created_at": "2024-05-01T12:00:00+00:00"}),
+    raw_cursor(["2024-05-01T12:00:00+00:00"]),
+    raw_cursor(['2024-05-01",id.gt.0', str(uuid.uuid4())]),
+    raw_cursor(["2024-05-01T12:00:00+00:00", "1),user_id.neq.(x"]),
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+class FakeDatabase:
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: (row["created_at"], row["id"]))
+
+    async def iter_user_conversations(self, user_id, page_size=100, after=None):
+        rows = [row for row in self.rows if after is None or (row["created_at"], row["id"]) > after]
+        for start in range(0, len(rows), page_size):
+            yield rows[start:start + page_size]
+
+    async def iter_conversation_messages(self, conversation_id, page_size=500, after=None):
+        yield [{"conversation_id": conversation_id, "content": "hi"}]
+
+def export(cursor=None):
+    async def run():
+        return [orjson.loads(line) async for chunk in export_service.ndjson("user", cursor) for line in chunk.splitlines()]
+    return asyncio.run(run())
+
+def test_export_resumes_after_cursor(monkeypatch):
+    rows = [conversation(f"2024-05-0{day}T00:00:00+00:00") for day in range(1, 6)]
+    monkeypatch.setattr(export_module, "db_service", FakeDatabase(rows))
+    monkeypatch.setattr(settings, "export_page_size", 2)
+    monkeypatch.setattr(settings, "export_pages_per_second", 0)
+
+    records = export()
+    cursors = [record["cursor"] for record in records if record["type"] == "cursor"]
+    assert len(cursors) == len(rows)
+
+    resumed = export(cursors[1])
+    exported = [record["data"]["id"] for record in resumed if record["type"] == "conversation"]
+    assert exported == [row["id"] for row in FakeDatabase(rows).rows[2:]]
+    assert resumed[-1] == {"type": "end"}
@@ -0,0 +1,80 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services.idempotency_service import IdempotencyConflictError, IdempotencyService
+
+FINGERPRINT = IdempotencyService.fingerprint("POST", "/api/v1/chat", {"message": "hi"})
+RESPONSE = {"response": "hello", "conversation_id": "c1"}
+
+def test_fingerprint_ignores_key_order():
+    assert IdempotencyService.fingerprint({"a": 1, "b": 2}) == IdempotencyService.fingerprint({"b": 2, "a": 1})
+
+def test_completed_request_is_replayed():
+    async def run():
+        service = IdempotencyService()
+        assert await service.begin("u1", "k", FINGERPRINT) is None
+        await service.complete("u1", "k", FINGERPRINT, RESPONSE)
+        return await service.begin("u1", "k", FINGERPRINT)
+    assert asyncio.run(run()) == RESPONSE
+
+def test_key_reused_with_another_payload_conflicts():
+    async def run():
+        service = IdempotencyService()
+        await service.begin("u1", "k", FINGERPRINT)
+        await service.complete("u1", "k", FINGERPRINT, RESPONSE)
+        await service.begin("u1", "k", IdempotencyService.fingerprint("POST", "/api/v1/chat", {"message": "bye"}))
+    with pytest.raises(IdempotencyConflictError):
+        asyncio.run(run())
+
+def test_keys_are_scoped_per_user():
+    async def run():
+        service = IdempotencyService()
+        await service.begin("u1", "k", FINGERPRINT)
+        await service.complete("u1", "k", FINGERPRINT, RESPONSE)
+        return await service.begin("u2", "k", FINGERPRINT)
+    assert asyncio.run(run()) is None
+
+def test_failed_request_releases_the_key():
+    async def run():
+        service = IdempotencyService()
+        await service.begin("u1", "k", FINGERPRINT)
+        await service.fail("u1", "k")
+        return await service.begin("u1", "k", FINGERPRINT)
+    assert asyncio.run(run()) is None
+
+def test_concurrent_retry_waits_for_the_original():
+    entered = []
+
+    @asynccontextmanager
+    async def waiting():
+        entered.append(True)
+        yield
+
+    async def run():
+        service = IdempotencyService()
+        await service.begin("u1", "k", FINGERPRINT)
+        retry = asyncio.create_task(service.begin("u1", "k", FINGERPRINT, waiting))
+        await asyncio.sleep(0)
+        assert not retry.done()
+        await service.complete("u1", "k", FINGERPRINT, RESPONSE)
+        return await retry
+    assert asyncio.run(run()) == RESPONSE
+    assert entered == [True]
+
+def test_concurrent_retry_takes_over_when_the_original_fails():
+    async def run():
+        service = IdempotencyService()
+        await service.begin("u1", "k", FINGERPRINT)
+        retry = asyncio.create_task(service.begin("u1", "k", FINGERPRINT))
+        await asyncio.sleep(0)
+        await service.fail("u1", "k")
+        owned = await retry
+        # The retry now holds the key, so a third request waits on it
+        third = asyncio.create_task(service.begin("u1", "k", FINGERPRINT))
+        await asyncio.sleep(0)
+        assert not third.done()
+        await service.complete("u1", "k", FINGERPRINT, RESPONSE)
+        return owned, await third
+    assert asyncio.run(run()) == (None, RESPONSE)
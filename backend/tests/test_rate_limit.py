@@ -0,0 +1,37 @@
+import asyncio
+
+from app.config import settings
+from app.services.rate_limit_service import RateLimitService
+
+def exhaust(service: RateLimitService, key: str, tier: str) -> int:
+    """Requests allowed for key before the tier refuses one"""
+    async def run():
+        allowed = 0
+        while (await service.check(key, tier)).allowed:
+            allowed += 1
+        return allowed
+    return asyncio.run(run())
+
+def test_tier_allows_its_request_limit():
+    service = RateLimitService()
+    assert exhaust(service, "user:a", "write") == settings.rate_limit_write_requests
+
+def test_refusal_carries_retry_after():
+    service = RateLimitService()
+    exhaust(service, "user:a", "write")
+    result = asyncio.run(service.check("user:a", "write"))
+    assert not result.allowed
+    assert int(result.headers["Retry-After"]) >= 1
+    assert result.headers["RateLimit-Remaining"] == "0"
+
+def test_writes_do_not_spend_the_read_budget():
+    service = RateLimitService()
+    exhaust(service, "user:a", "write")
+    result = asyncio.run(service.check("user:a", "read"))
+    assert result.allowed
+    assert result.remaining == settings.rate_limit_read_requests - 1
+
+def test_token_budget_refuses_large_requests():
+    service = RateLimitService()
+    result = asyncio.run(service.check("user:a", "chat", tokens=settings.rate_limit_chat_tokens + 1))
+    assert not result.allowed
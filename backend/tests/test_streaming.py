@@ -0,0 +1,131 @@
+import asyncio
+import gzip
+from typing import Optional
+
+import orjson
+import pytest
+from fastapi import Request
+from pydantic import BaseModel
+
+from app.utils.streaming import NDJSON, single_page, stream_rows, stream_with_cleanup
+
+class Row(BaseModel):
+    id: str
+    title: Optional[str] = None
+
+async def chunks():
+    yield b"a"
+    yield b"b"
+
+def run_response(response, receive, send):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    asyncio.run(response(scope, receive, send))
+
+def test_cleanup_runs_once_after_full_body():
+    calls = []
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    async def send(message):
+        sent.append(message)
+
+    run_response(stream_with_cleanup(chunks(), lambda: calls.append(1)), receive, send)
+    assert b"".join(m.get("body", b"") for m in sent) == b"ab"
+    assert calls == [1]
+
+def test_cleanup_runs_when_client_leaves_before_first_chunk():
+    calls = []
+    started = []
+
+    async def body():
+        started.append(True)
+        yield b"never"
+
+    async def cleanup():
+        calls.append(1)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # Slower than the disconnect, so the body is never started
+        await asyncio.sleep(10)
+
+    run_response(stream_with_cleanup(body(), cleanup), receive, send)
+    assert started == []
+    assert calls == [1]
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+async def pages(*batches):
+    for batch in batches:
+        yield batch
+
+def collect(request, *batches, version=None):
+    """Status, headers and raw body of stream_rows over the given pages"""
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        # One loop for both, as the pages generator outlives stream_rows
+        response = await stream_rows(request, pages(*batches), Row, version=version)
+        await response({"type": "http", "method": "GET", "path": "/", "headers": []}, receive, send)
+
+    asyncio.run(run())
+    headers = {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+    return sent[0]["status"], headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+ROWS = [{"id": "1", "title": "a", "secret": "x"}, {"id": "2", "title": None}]
+
+def test_rows_stream_as_json_array_of_model_fields():
+    status, headers, body = collect(make_request(), ROWS[:1], [], ROWS[1:])
+    assert status == 200
+    assert headers["content-type"] == "application/json"
+    assert orjson.loads(body) == [{"id": "1", "title": "a"}, {"id": "2", "title": None}]
+
+def test_empty_result_is_an_empty_array():
+    assert orjson.loads(collect(make_request())[2]) == []
+
+def test_ndjson_on_request():
+    _, headers, body = collect(make_request(accept=NDJSON), ROWS)
+    assert headers["content-type"] == NDJSON
+    assert [orjson.loads(line) for line in body.splitlines()] == [{"id": "1", "title": "a"}, {"id": "2", "title": None}]
+
+def test_gzip_body_decompresses_to_the_same_rows():
+    _, headers, body = collect(make_request(accept_encoding="gzip"), ROWS[:1], ROWS[1:])
+    assert headers["content-encoding"] == "gzip"
+    assert orjson.loads(gzip.decompress(body)) == [{"id": "1", "title": "a"}, {"id": "2", "title": None}]
+
+def test_matching_etag_gets_304_without_reading_rows():
+    _, headers, _ = collect(make_request(), ROWS, version="v1")
+    read = []
+
+    async def untouched():
+        read.append(True)
+        yield ROWS
+
+    response = asyncio.run(stream_rows(make_request(if_none_match=headers["etag"]), untouched(), Row, version="v1"))
+    assert response.status_code == 304
+    assert read == []
+
+def test_etag_changes_with_version_and_format():
+    etag = lambda request, version: collect(request, ROWS, version=version)[1]["etag"]
+    assert etag(make_request(), "v1") != etag(make_request(), "v2")
+    assert etag(make_request(), "v1") != etag(make_request(accept=NDJSON), "v1")
+
+def test_first_page_error_reaches_the_caller():
+    async def failing():
+        raise RuntimeError("database down")
+        yield
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(stream_rows(make_request(), failing(), Row))
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.models.history import ASSISTANT, USER, ConversationHistory
+from app.models.user import UserType
+from app.services.ai_service import ai_service
+from app.services.summary_service import summary_service
+
+def make_history(length: int) -> ConversationHistory:
+    history = ConversationHistory()
+    for i in range(length):
+        history.append(USER if i % 2 == 0 else ASSISTANT, f"m{i}")
+    return history
+
+@pytest.fixture
+def folds(monkeypatch):
+    """Messages passed to each scheduled summary, without calling the model"""
+    calls = []
+
+    async def fake_summarize(conversation_id, previous_summary, summarized, messages):
+        calls.append(messages)
+
+    monkeypatch.setattr(summary_service, "_summarize", fake_summarize)
+    return calls
+
+def schedule(history: ConversationHistory):
+    async def run():
+        summary_service.maybe_schedule("conversation", history)
+        await asyncio.gather(*summary_service._running.values())
+    asyncio.run(run())
+
+def fold_threshold() -> int:
+    return ai_service.history_window + 2 * settings.summary_every_turns
+
+def test_no_fold_below_threshold(folds):
+    schedule(make_history(fold_threshold() - 1))
+    assert folds == []
+
+def test_fold_at_threshold_keeps_window(folds):
+    schedule(make_history(fold_threshold()))
+    assert len(folds) == 1
+    assert len(folds[0]) == 2 * settings.summary_every_turns
+    assert folds[0][0] == (USER, "m0")
+
+def test_fold_never_splits_an_exchange(folds):
+    schedule(make_history(fold_threshold() + 1))
+    assert len(folds[0]) % 2 == 0
+    assert folds[0][-1][0] == ASSISTANT
+
+def test_prompt_keeps_every_message_before_first_summary():
+    history = make_history(fold_threshold() - 1)
+    messages = ai_service.build_messages("next", history, UserType.STUDENT)
+    contents = [message["content"] for message in messages]
+    assert all(f"m{i}" in contents for i in range(len(history)))
+
+def test_prompt_carries_summary_and_tail():
+    history = make_history(4)
+    history.summary, history.summarized = "earlier", 20
+    messages = ai_service.build_messages("next", history, UserType.STUDENT)
+    assert "earlier" in messages[1]["content"]
+    assert [m["content"] for m in messages[2:]] == ["m0", "m1", "m2", "m3", "next"]
@@ -0,0 +1,42 @@
+import os
+
+from app.services.tts_service import AudioCache
+
+def store(cache: AudioCache, key: str, data: bytes):
+    temp_path = cache.temp_path(key)
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    cache.add(key, cache.publish(key, temp_path))
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10)
+    store(cache, "aa1", b"1234")
+    store(cache, "aa2", b"1234")
+    assert cache.get("aa1")
+    store(cache, "aa3", b"1234")
+    assert cache.get("aa2") is None
+    assert cache.get("aa1") and cache.get("aa3")
+    assert cache.total_bytes == 8
+
+def test_adopts_file_written_by_another_worker(tmp_path):
+    writer = AudioCache(str(tmp_path), max_bytes=100)
+    reader = AudioCache(str(tmp_path), max_bytes=100)
+    store(writer, "bb1", b"audio")
+    assert reader.get("bb1") == writer.path("bb1")
+    assert reader.total_bytes == 5
+
+def test_forgets_file_removed_from_disk(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=100)
+    store(cache, "cc1", b"audio")
+    os.remove(cache.path("cc1"))
+    assert cache.get("cc1") is None
+    assert cache.total_bytes == 0
+
+def test_rebuilds_index_and_drops_partial_files(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=100)
+    store(cache, "dd1", b"audio")
+    partial = cache.temp_path("dd2")
+    open(partial, "wb").close()
+    restarted = AudioCache(str(tmp_path), max_bytes=100)
+    assert restarted.total_bytes == 5
+    assert not os.path.exists(partial)